@@ -5,14 +5,19 @@ This module handles the orchestration of batch processing operations:
 fetching summaries, chunking them, and inserting chunks to MongoDB.
 """
 
+import os
 import sys
 import asyncio
+import functools
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
-from dotenv import load_dotenv
+from bson import encode
+from bson.raw_bson import RawBSONDocument
 from tqdm.asyncio import tqdm as async_tqdm
 
-load_dotenv()
-
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
@@ -20,89 +25,207 @@ from chunks.config import logger
 from chunks.text_processing import chunk_summary
 from chunks.database import batch_get_summaries, batch_insert_chunks
 
+# Start the shared-memory resource tracker before any worker exists so workers share
+# it; otherwise a worker's own tracker would unlink attached segments when it exits
+resource_tracker.ensure_running()
+
+# Chunking is pure-Python CPU work, so run it in worker processes rather than
+# threads that would serialize on the GIL
+_CHUNK_POOL = ProcessPoolExecutor(max_workers=os.cpu_count())
+
+# Summaries sent to a worker per executor submission
+_SUMMARIES_PER_TASK = 25
+
+# Batches with at least this many summaries hand the text to workers through one
+# shared memory block instead of pickling it into every submission
+_SHARED_MEMORY_MIN_SUMMARIES = 500
+
+
+def _chunk_many(items: list[tuple[int, str]]) -> list[bytes]:
+    """
+    Chunk a group of (qid, summary) pairs inside a single worker task.
+    
+    Chunks are BSON-encoded here so the encoding happens in the worker process and
+    the main process can insert them as RawBSONDocuments without re-encoding.
+    """
+    encoded_chunks = []
+    for qid, summary_text in items:
+        try:
+            encoded_chunks.extend(encode(chunk) for chunk in chunk_summary(qid, summary_text))
+        except Exception as e:
+            logger.error(f"Error chunking summary for qid {qid}: {e}")
+    return encoded_chunks
+
+
+def _chunk_many_shared(shm_name: str, items: list[tuple[int, int, int]]) -> list[bytes]:
+    """
+    Chunk a group of summaries stored in a shared memory block inside a single worker task.
+    
+    Args:
+        shm_name: Name of the shared memory block holding the UTF-8 summary text
+        items: (qid, offset, length) of each summary within the block
+    """
+    shm = SharedMemory(name=shm_name)
+    try:
+        summaries = [
+            (qid, bytes(shm.buf[offset:offset + length]).decode())
+            for qid, offset, length in items
+        ]
+    finally:
+        shm.close()
+    return _chunk_many(summaries)
+
+
+def _summaries_to_shared_memory(summaries: dict[int, str]) -> tuple[SharedMemory, list[tuple[int, int, int]]]:
+    """
+    Copy summary text into one shared memory block.
+    
+    Returns:
+        The shared memory block (caller closes and unlinks it) and the
+        (qid, offset, length) of each summary within it
+    """
+    encoded = [(qid, summary_text.encode()) for qid, summary_text in summaries.items()]
+    shm = SharedMemory(create=True, size=max(1, sum(len(data) for _, data in encoded)))
+    
+    items = []
+    offset = 0
+    for qid, data in encoded:
+        shm.buf[offset:offset + len(data)] = data
+        items.append((qid, offset, len(data)))
+        offset += len(data)
+    return shm, items
+
 
-async def process_summaries_batch(qids: list[int], batch_size: int = 100, max_concurrent: int = 10) -> None:
+async def process_summaries_batch(qids: list[int], batch_size: int = 100) -> None:
     """
     Process summaries in batches: fetch, chunk, and insert chunks to MongoDB.
     
-    For each batch:
-    1. Fetch all summaries in a single MongoDB query
-    2. Process summaries concurrently (CPU-bound chunking)
-    3. Batch insert all chunks to MongoDB
+    Runs as a three-stage pipeline connected by bounded queues, so fetching,
+    chunking and inserting of different batches overlap:
+    1. Fetcher: fetch each batch's summaries in a single MongoDB query
+    2. Chunker: chunk summaries in parallel across worker processes (CPU-bound chunking)
+    3. Inserter: batch insert all chunks to MongoDB
     
     Args:
         qids: List of question IDs to process
         batch_size: Number of qids to process per batch (default: 100)
-        max_concurrent: Maximum concurrent chunking operations per batch (default: 10)
     """
     if not qids:
         logger.info("No qids to process")
         return
     
-    semaphore = asyncio.Semaphore(max_concurrent)
+    loop = asyncio.get_running_loop()
     
-    async def process_single_qid(qid: int, summary_text: str) -> list[dict]:
-        """Process a single qid: chunk the summary and return chunks."""
-        async with semaphore:
-            try:
-                # Run CPU-bound chunking in thread pool to avoid blocking
-                chunks = await asyncio.to_thread(chunk_summary, qid, summary_text)
-                return chunks
-            except Exception as e:
-                logger.error(f"Error chunking summary for qid {qid}: {e}")
-                return []
+    # Stage hand-offs; None marks the end of the stream
+    fetch_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    chunk_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
     
-    # Process qids in batches
-    total_batches = (len(qids) + batch_size - 1) // batch_size
-    logger.info(f"Processing {len(qids)} qids in {total_batches} batches (batch_size={batch_size})")
+    async def process_summary_group(chunk_fn, items: list[tuple]) -> list[bytes]:
+        """Process a group of qids: chunk their summaries in one worker task."""
+        try:
+            # Run CPU-bound chunking in the process pool (its queue bounds concurrency)
+            return await loop.run_in_executor(_CHUNK_POOL, chunk_fn, items)
+        except Exception as e:
+            logger.error(f"Error chunking summaries for qids {[item[0] for item in items]}: {e}")
+            return []
     
-    with async_tqdm(total=len(qids), desc="Processing summaries") as pbar:
+    async def chunk_summaries(summaries: dict[int, str]) -> list[RawBSONDocument]:
+        """Chunk one batch's summaries in parallel and return the flattened chunks."""
+        shm = None
+        if len(summaries) >= _SHARED_MEMORY_MIN_SUMMARIES:
+            shm, items = _summaries_to_shared_memory(summaries)
+            chunk_fn = functools.partial(_chunk_many_shared, shm.name)
+        else:
+            items = list(summaries.items())
+            chunk_fn = _chunk_many
+        
+        try:
+            tasks = [
+                process_summary_group(chunk_fn, items[i:i + _SUMMARIES_PER_TASK])
+                for i in range(0, len(items), _SUMMARIES_PER_TASK)
+            ]
+            
+            # Collect all chunks from concurrent processing
+            chunk_results = await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+        
+        # Log errors, then flatten chunks in one pass
+        for result in chunk_results:
+            if isinstance(result, Exception):
+                logger.error(f"Error in chunking task: {result}")
+        return [
+            RawBSONDocument(encoded_chunk)
+            for encoded_chunk in itertools.chain.from_iterable(
+                result for result in chunk_results if isinstance(result, list)
+            )
+        ]
+    
+    async def fetcher() -> None:
+        """Stage 1: fetch all summaries in each batch (single MongoDB query)."""
         for batch_idx in range(0, len(qids), batch_size):
             batch_qids = qids[batch_idx:batch_idx + batch_size]
             batch_num = batch_idx // batch_size + 1
             
             try:
-                # Step 1: Fetch all summaries in batch (single MongoDB query)
                 logger.info(f"Batch {batch_num}/{total_batches}: Fetching {len(batch_qids)} summaries...")
                 summaries = await batch_get_summaries(batch_qids)
-                
-                if not summaries:
-                    logger.warning(f"Batch {batch_num}: No summaries found for {len(batch_qids)} qids")
-                    pbar.update(len(batch_qids))
-                    continue
-                
-                # Step 2: Process summaries concurrently (CPU-bound chunking)
-                logger.info(f"Batch {batch_num}: Chunking {len(summaries)} summaries...")
-                tasks = [
-                    process_single_qid(qid, summary_text)
-                    for qid, summary_text in summaries.items()
-                ]
-                
-                # Collect all chunks from concurrent processing
-                chunk_results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Flatten chunks and filter out errors
-                all_chunks = []
-                for result in chunk_results:
-                    if isinstance(result, Exception):
-                        logger.error(f"Error in chunking task: {result}")
-                    elif isinstance(result, list):
-                        all_chunks.extend(result)
-                
-                # Step 3: Batch insert all chunks to MongoDB
-                if all_chunks:
-                    logger.info(f"Batch {batch_num}: Inserting {len(all_chunks)} chunks...")
-                    await batch_insert_chunks(all_chunks)
-                    logger.info(f"Batch {batch_num}: Completed - {len(summaries)} summaries, {len(all_chunks)} chunks")
-                else:
-                    logger.warning(f"Batch {batch_num}: No chunks generated")
-                
-                # Update progress bar
+            except Exception as e:
+                logger.error(f"Error fetching batch {batch_num}: {e}")
+                pbar.update(len(batch_qids))
+                continue
+            
+            if not summaries:
+                logger.warning(f"Batch {batch_num}: No summaries found for {len(batch_qids)} qids")
                 pbar.update(len(batch_qids))
-                
+                continue
+            
+            await fetch_queue.put((batch_num, batch_qids, summaries))
+        await fetch_queue.put(None)
+    
+    async def chunker() -> None:
+        """Stage 2: chunk each fetched batch in the process pool (CPU-bound chunking)."""
+        while (item := await fetch_queue.get()) is not None:
+            batch_num, batch_qids, summaries = item
+            
+            try:
+                logger.info(f"Batch {batch_num}: Chunking {len(summaries)} summaries...")
+                all_chunks = await chunk_summaries(summaries)
             except Exception as e:
-                logger.error(f"Error processing batch {batch_num}: {e}")
+                logger.error(f"Error chunking batch {batch_num}: {e}")
+                pbar.update(len(batch_qids))
+                continue
+            
+            if not all_chunks:
+                logger.warning(f"Batch {batch_num}: No chunks generated")
                 pbar.update(len(batch_qids))
                 continue
+            
+            await chunk_queue.put((batch_num, batch_qids, len(summaries), all_chunks))
+        await chunk_queue.put(None)
+    
+    async def inserter() -> None:
+        """Stage 3: batch insert each batch's chunks to MongoDB."""
+        while (item := await chunk_queue.get()) is not None:
+            batch_num, batch_qids, num_summaries, all_chunks = item
+            
+            try:
+                logger.info(f"Batch {batch_num}: Inserting {len(all_chunks)} chunks...")
+                await batch_insert_chunks(all_chunks)
+                logger.info(f"Batch {batch_num}: Completed - {num_summaries} summaries, {len(all_chunks)} chunks")
+            except Exception as e:
+                logger.error(f"Error inserting chunks for batch {batch_num}: {e}")
+            
+            # Update progress bar
+            pbar.update(len(batch_qids))
+    
+    # Process qids in batches
+    total_batches = (len(qids) + batch_size - 1) // batch_size
+    logger.info(f"Processing {len(qids)} qids in {total_batches} batches (batch_size={batch_size})")
+    
+    with async_tqdm(total=len(qids), desc="Processing summaries") as pbar:
+        await asyncio.gather(fetcher(), chunker(), inserter())
     
     logger.info(f"Completed processing {len(qids)} qids")
@@ -9,13 +9,16 @@ This module handles:
 """
 
 import os
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 from datetime import datetime
 from dotenv import load_dotenv
 from pymongo import AsyncMongoClient, MongoClient
 import certifi
 
-# Load environment variables
+# Load environment variables (the only load_dotenv call in the chunks package)
 load_dotenv()
 
 # ============================================================================
@@ -38,15 +41,35 @@ LOG_DIR = "logs"
 os.makedirs(LOG_DIR, exist_ok=True)
 log_filename = os.path.join(LOG_DIR, f"chunks_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
 
-# Configure logging to both file and console
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
+# Configure logging to both file and console (once, so a re-import doesn't
+# open another log file or attach duplicate handlers).
+# Log calls only enqueue records; a background listener thread does the actual
+# file/console writes so they don't block the event loop.
+if not logging.getLogger().handlers:
+    log_handlers = [
         logging.FileHandler(log_filename),
         logging.StreamHandler()
     ]
-)
+    for handler in log_handlers:
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    
+    log_queue = queue.Queue(-1)
+    log_listener = QueueListener(log_queue, *log_handlers)
+    log_listener.start()
+    atexit.register(log_listener.stop)
+    
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    root_logger.addHandler(QueueHandler(log_queue))
+    
+    def _log_directly_in_child() -> None:
+        """Forked worker processes don't inherit the listener thread, so write to the handlers directly."""
+        for handler in list(root_logger.handlers):
+            root_logger.removeHandler(handler)
+        for handler in log_handlers:
+            root_logger.addHandler(handler)
+    
+    os.register_at_fork(after_in_child=_log_directly_in_child)
 
 logger = logging.getLogger(__name__)
 
@@ -80,4 +103,10 @@ SECTIONS = [
     "12. Natural Language Search Terms"  # for RAG Discovery
 ]  
 
+# SECTIONS split once into (num, name, num as int), e.g. ("1", "Problem Essence", 1)
+SECTIONS_PARSED = tuple(
+    (num, name, int(num))
+    for num, name in (section.split(". ", 1) for section in SECTIONS)
+)
+
 EXCLUDED_PROBLEMS = [975, 1149, 1398, 752, 2797, 3127, 3160]
@@ -5,17 +5,19 @@ This module handles MongoDB operations for fetching summaries and inserting chun
 """
 
 import sys
+import asyncio
 from pathlib import Path
-from dotenv import load_dotenv
 from pymongo import ReplaceOne
-
-load_dotenv()
+from pymongo.errors import BulkWriteError
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from chunks.config import async_mongo_client, chunks_collection, logger, EXCLUDED_PROBLEMS
 
+# Caps concurrent bulk writes so large batches don't exhaust the connection pool
+_WRITE_SEM = asyncio.Semaphore(4)
+
 async def get_qids_to_process(excluded_qids: list[int] = None) -> list[int]:
     """
     Get all question IDs from the summaries collection, excluding specified qids.
@@ -32,13 +34,13 @@ async def get_qids_to_process(excluded_qids: list[int] = None) -> list[int]:
     db = async_mongo_client["leetcode_questions"]
     summary_collection = db["question_summaries"]
     
-    # Fetch all qids from summaries collection
-    cursor = summary_collection.find({}, {"qid": 1, "_id": 0})
-    qids = []
-    async for doc in cursor:
-        qid = doc.get("qid")
-        if qid is not None and qid not in excluded_qids:
-            qids.append(qid)
+    # Fetch qids from summaries collection, letting the server drop excluded qids
+    # (large batches to cut getMore round trips)
+    cursor = summary_collection.find(
+        {"qid": {"$nin": list(excluded_qids)}},
+        {"qid": 1, "_id": 0}
+    ).batch_size(5000)
+    qids = [doc["qid"] async for doc in cursor if doc.get("qid") is not None]
     
     return qids
 
@@ -59,7 +61,7 @@ async def batch_get_summaries(qids: list[int]) -> dict[int, str]:
     cursor = summary_collection.find(
         {"qid": {"$in": qids}},
         {"qid": 1, "summary": 1, "_id": 0}
-    )
+    ).batch_size(1000)
     
     # Build dict mapping qid to summary
     summaries = {}
@@ -70,42 +72,74 @@ async def batch_get_summaries(qids: list[int]) -> dict[int, str]:
     return summaries
 
 
-async def batch_insert_chunks(chunks: list[dict], batch_size: int = 500) -> None:
+async def _write_chunk_batch(batch_num: int, batch: list[dict]) -> None:
     """
-    Insert or replace chunks in MongoDB using bulk write operations.
-    
-    Uses ReplaceOne with upsert=True to replace existing chunks or insert new ones.
-    Processes chunks in batches for efficiency.
+    Write one slice of chunks: unordered insert_many, then ReplaceOne for duplicates.
     
     Args:
-        chunks: List of chunk documents in format [{"qid": int, "chunk_id": int, "text": str}, ...]
-        batch_size: Number of chunks to process per batch (default: 500)
+        batch_num: 1-based slice number (for logging)
+        batch: Chunk documents in this slice
     """
-    if not chunks:
-        return
-    
-    try:
-        # Process chunks in batches
-        for i in range(0, len(chunks), batch_size):
-            batch = chunks[i:min(i + batch_size, len(chunks))]
+    async with _WRITE_SEM:
+        try:
+            await chunks_collection.insert_many(batch, ordered=False)
+            inserted_count = len(batch)
+            replaced_count = 0
+        except BulkWriteError as e:
+            write_errors = e.details.get("writeErrors", [])
+            duplicate_errors = [err for err in write_errors if err.get("code") == 11000]
+            if len(duplicate_errors) != len(write_errors):
+                raise
             
-            # Build ReplaceOne operations for this batch
+            # Replace chunks that already exist (drop the _id insert_many assigned)
             operations = [
                 ReplaceOne(
-                    {"qid": chunk["qid"], "chunk_id": chunk["chunk_id"]},
-                    chunk,
+                    {"qid": batch[err["index"]]["qid"], "chunk_id": batch[err["index"]]["chunk_id"]},
+                    {k: v for k, v in batch[err["index"]].items() if k != "_id"},
                     upsert=True
                 )
-                for chunk in batch
+                for err in duplicate_errors
             ]
-            
-            # Execute bulk write
-            result = await chunks_collection.bulk_write(operations, ordered=False)
-            logger.info(
-                f"Batch {i // batch_size + 1}: Inserted/replaced "
-                f"{result.upserted_count + result.modified_count} chunks "
-                f"({len(batch)} total in batch)"
-            )
+            replace_result = await chunks_collection.bulk_write(operations, ordered=False)
+            inserted_count = e.details.get("nInserted", 0)
+            replaced_count = replace_result.upserted_count + replace_result.modified_count
+    
+    logger.info(
+        f"Batch {batch_num}: Inserted {inserted_count}, replaced "
+        f"{replaced_count} chunks ({len(batch)} total in batch)"
+    )
+
+
+async def batch_insert_chunks(chunks: list[dict], batch_size: int = 1000) -> None:
+    """
+    Insert or replace chunks in MongoDB using bulk write operations.
+    
+    Tries a plain unordered insert_many first, since freshly generated chunks are
+    almost always new. Chunks that hit the (qid, chunk_id) unique index are then
+    replaced with ReplaceOne operations.
+    Splits chunks into batches that are written concurrently (at most 4 at a time).
+    
+    Args:
+        chunks: List of chunk documents in format [{"qid": int, "chunk_id": int, "text": str}, ...],
+            either as dicts or as pre-encoded RawBSONDocuments
+        batch_size: Number of chunks to process per batch (default: 1000)
+    """
+    if not chunks:
+        return
+    
+    try:
+        results = await asyncio.gather(
+            *[
+                _write_chunk_batch(i // batch_size + 1, chunks[i:i + batch_size])
+                for i in range(0, len(chunks), batch_size)
+            ],
+            return_exceptions=True
+        )
+        
+        # Surface the first failure once every slice has finished
+        for result in results:
+            if isinstance(result, Exception):
+                raise result
             
     except Exception as e:
         logger.error(f"Error in batch_insert_chunks: {e}")
@@ -3,15 +3,12 @@ Script to chunk and upload summaries for specific qids.
 
 This script is designed for handling a small number of summaries (e.g., 5)
 that need to be processed manually. Uses process_summaries_batch with
-max_concurrent=1 for sequential processing.
+all qids in a single batch.
 """
 
 import sys
 import asyncio
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -34,11 +31,10 @@ async def main():
     try:
         logger.info(f"Processing {len(qids_to_process)} qids: {qids_to_process}")
         
-        # Use process_summaries_batch with max_concurrent=1 for sequential processing
+        # Use process_summaries_batch with all qids in a single batch
         await process_summaries_batch(
             qids=qids_to_process,
-            batch_size=len(qids_to_process),  # Process all in one batch
-            max_concurrent=1  # Sequential processing (one at a time)
+            batch_size=len(qids_to_process)  # Process all in one batch
         )
         
         logger.info("Processing completed successfully!")
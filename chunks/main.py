@@ -11,9 +11,6 @@ This script orchestrates the complete batch processing pipeline:
 import sys
 import asyncio
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
@@ -23,22 +20,36 @@ from chunks.database import get_qids_to_process
 from chunks.batch_processor import process_summaries_batch
 
 async def create_index() -> None:
-    """Create compound unique index on (qid, chunk_id) for efficient upserts."""
+    """
+    Create compound unique index on (qid, chunk_id) for efficient upserts,
+    an index on qid in question_summaries for the qid/summary lookups, and a
+    text index on summary for chunks.utils.find_questions_by_summary_string.
     
-    try:
-        # Create compound unique index
-        await chunks_collection.create_index(
-            [("qid", 1), ("chunk_id", 1)],
-            unique=True,
-            name="qid_chunk_id_unique"
-        )
-        logger.info("Created compound unique index on (qid, chunk_id)")
-    except Exception as e:
-        # Index might already exist, which is fine
-        if "already exists" in str(e).lower() or "duplicate key" in str(e).lower():
-            logger.info("Index on (qid, chunk_id) already exists")
-        else:
-            logger.warning(f"Could not create index (may already exist): {e}")
+    Existing indexes are checked first (via index_information), so the index specs are
+    only sent to the server when an index is actually missing.
+    """
+    summary_collection = async_mongo_client["leetcode_questions"]["question_summaries"]
+    indexes = [
+        (chunks_collection, [("qid", 1), ("chunk_id", 1)], {"unique": True, "name": "qid_chunk_id_unique"}),
+        (summary_collection, [("qid", 1)], {"name": "qid_1"}),
+        # No stemming or stop words, so whole-word searches can always use it
+        (summary_collection, [("summary", "text")], {"name": "summary_text", "default_language": "none"}),
+    ]
+    
+    for collection, keys, options in indexes:
+        try:
+            existing_indexes = await collection.index_information()
+            # Text indexes are stored under internal keys, so match on the name too
+            if options["name"] in existing_indexes or any(
+                index["key"] == keys for index in existing_indexes.values()
+            ):
+                logger.info(f"Index {options['name']} on {collection.name} already exists")
+                continue
+            
+            await collection.create_index(keys, background=True, **options)
+            logger.info(f"Created index {options['name']} on {collection.name}")
+        except Exception as e:
+            logger.warning(f"Could not create index {options['name']} on {collection.name}: {e}")
 
 
 async def main():
@@ -62,11 +73,10 @@ async def main():
         # Step 3: Process summaries in batches
         # Configuration:
         # - batch_size: Number of qids to process per batch (100 = fetch 100 summaries at once)
-        # - max_concurrent: Number of concurrent chunking operations per batch (10 = chunk 10 summaries simultaneously)
+        # Chunking runs in a process pool sized to the number of CPU cores
         await process_summaries_batch(
             qids=qids,
-            batch_size=200,      # Process 200 qids per batch
-            max_concurrent=16     # 2x CPU cores
+            batch_size=200      # Process 200 qids per batch
         )
         
         logger.info("Batch processing completed successfully!")
@@ -1,9 +1,6 @@
 import sys
 import asyncio
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
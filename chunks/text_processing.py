@@ -8,14 +8,58 @@ into chunks based on section headers.
 import sys
 import re
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
-from chunks.config import SECTIONS
+from chunks.config import SECTIONS_PARSED
+
+# Header decorations that may precede "{num}. {name}": **, ## (with optional space), <strong>, or nothing
+_HEADER_PREFIXES = (r'\*\*', r'##\s*', r'<strong>', '')
+
+# Pair each parsed section with each prefix; the group name is an empty marker
+# group identifying the variant matched
+_SECTION_VARIANTS = [
+    (f"s{num}_{prefix_idx}", prefix, num, name, chunk_id)
+    for num, name, chunk_id in SECTIONS_PARSED
+    for prefix_idx, prefix in enumerate(_HEADER_PREFIXES)
+]
+_SECTIONS_BY_GROUP = {group: (num, name, chunk_id) for group, _, num, name, chunk_id in _SECTION_VARIANTS}
+
+# Single pattern matching every section header in one pass:
+# - **{num}. {name}**
+# - ## {num}. {name} or ##{num}. {name}
+# - <strong>{num}. {name}</strong>
+# - {num}. {name} (plain)
+# Every prefix/section combination is spelled out as its own alternative so each one
+# starts with a literal character. That lets the regex engine build a first-character
+# set (*, #, <, digits) and skip everything else in C instead of attempting a match
+# at every position, which an optional leading group prevents.
+_SECTION_RE = re.compile(
+    '(?:'
+    + '|'.join(
+        prefix + re.escape(num) + r'\.\s+' + re.escape(name) + f"(?P<{group}>)"
+        for group, prefix, num, name, _ in _SECTION_VARIANTS
+    )
+    + ')'
+    + r'(?:\*\*|</strong>)?'  # Optional closing format: ** or </strong>
+)
+
+# Opening/closing section tags (e.g., <section_1_problem_essence>), removed in one pass.
+# The \\A alternative covers an opening tag preceded only by whitespace.
+_SECTION_TAG_RE = re.compile(
+    r'\A\s*<section_\w+>\s*|^<section_\w+>\s*|</section_\w+>\s*$',
+    re.MULTILINE
+)
+
+# Leading/trailing whitespace of a section's content, located with pos/endpos on the
+# full summary so only the trimmed content is ever sliced out
+_LEADING_WS_RE = re.compile(r'\s*')
+_TRAILING_WS_RE = re.compile(r'\s*\Z')
+
+# Separator (---) on its own first/last line, ignoring surrounding whitespace
+_LEADING_SEP_RE = re.compile(r'\A\s*---[^\S\n]*(?:\n|\Z)')
+_TRAILING_SEP_RE = re.compile(r'(?:\A|\n)[^\S\n]*---\s*\Z')
 
 
 def chunk_summary(qid: int, summary: str) -> list[dict]:
@@ -23,7 +67,7 @@ def chunk_summary(qid: int, summary: str) -> list[dict]:
     Split a problem summary into chunks based on section headers and format for MongoDB.
     
     Each chunk includes the section header and its content.
-    Sections are identified using the SECTIONS array from config.py.
+    Sections are identified using SECTIONS_PARSED from config.py.
     Missing sections are skipped (not included in the returned list).
     Handles various header formats: **text**, ## text, <strong>text</strong>, or plain text.
     
@@ -39,105 +83,42 @@ def chunk_summary(qid: int, summary: str) -> list[dict]:
 
     chunks = []
     
-    # Build regex patterns for each section that match various formatting styles
-    section_patterns = []
-    for section in SECTIONS:
-        # Extract number and name from section string (e.g., "1. Problem Essence")
-        parts = section.split(". ", 1)
-        if len(parts) != 2:
-            continue
-        
-        section_num = parts[0]
-        section_name = parts[1]
-        
-        # Escape special regex characters in section name
-        escaped_name = re.escape(section_name)
-        escaped_num = re.escape(section_num)
-        
-        # Build pattern that matches:
-        # - **{num}. {name}**
-        # - ## {num}. {name} or ##{num}. {name}
-        # - <strong>{num}. {name}</strong>
-        # - {num}. {name} (plain)
-        # Pattern allows optional formatting before and after
-        pattern = (
-            r'(?:\*\*|##\s*|<strong>)?'  # Optional opening format: ** or ## (with optional space) or <strong>
-            + escaped_num
-            + r'\.\s+'  # Literal dot and whitespace
-            + escaped_name
-            + r'(?:\*\*|</strong>)?'  # Optional closing format: ** or </strong>
-        )
-        
-        section_patterns.append({
-            'pattern': pattern,
-            'section': section,
-            'num': section_num,
-            'name': section_name
-        })
-    
-    # Find all section positions in the summary
-    section_matches = []
-    for pattern_info in section_patterns:
-        pattern = pattern_info['pattern']
-        matches = list(re.finditer(pattern, summary))
-        for match in matches:
-            section_matches.append({
-                'start': match.start(),
-                'end': match.end(),
-                'section': pattern_info['section'],
-                'num': pattern_info['num'],
-                'name': pattern_info['name'],
-                'full_match': match.group(0)
-            })
-    
-    # Sort by position in summary
-    section_matches.sort(key=lambda x: x['start'])
+    # Section matches come out of the single pattern already ordered by position,
+    # so walk them lazily, keeping one match of lookahead for the content end
+    section_matches = _SECTION_RE.finditer(summary)
+    next_match = next(section_matches, None)
     
     # Extract chunks
-    for i, match_info in enumerate(section_matches):
+    while next_match is not None:
+        match = next_match
+        next_match = next(section_matches, None)
+        section_num, section_name, chunk_id = _SECTIONS_BY_GROUP[match.lastgroup]
+        
         # Normalize header to {num}. {name} format
-        normalized_header = f"{match_info['num']}. {match_info['name']}"
+        normalized_header = f"{section_num}. {section_name}"
         
         # Find content start (after the header)
-        content_start = match_info['end']
+        content_start = match.end()
         
         # Find content end (start of next section or end of summary)
-        if i + 1 < len(section_matches):
-            content_end = section_matches[i + 1]['start']
-        else:
-            content_end = len(summary)
-        
-        # Extract content
-        content = summary[content_start:content_end]
-        
-        # Strip leading/trailing whitespace
-        content = content.strip()
-        
-        # Remove opening section tags (e.g., <section_1_problem_essence>)
-        content = re.sub(r'^<section_\w+>\s*', '', content, flags=re.MULTILINE)
-        
-        # Remove closing section tags (e.g., </section_1_problem_essence>)
-        content = re.sub(r'</section_\w+>\s*$', '', content, flags=re.MULTILINE)
-        
-        # Strip again after removing tags
-        content = content.strip()
+        content_end = next_match.start() if next_match is not None else len(summary)
         
-        # Remove leading separator (---) if present (on its own line or at start)
-        lines = content.split('\n')
-        if lines and lines[0].strip() == '---':
-            content = '\n'.join(lines[1:]).strip()
+        # Narrow the bounds past surrounding whitespace before slicing, so the slice is
+        # the only copy made unless tags or separators need removing
+        content_start = _LEADING_WS_RE.match(summary, content_start, content_end).end()
+        content_end = _TRAILING_WS_RE.search(summary, content_start, content_end).start()
         
-        # Remove trailing separator (---) if present (on its own line or at end)
-        lines = content.split('\n')
-        if lines and lines[-1].strip() == '---':
-            content = '\n'.join(lines[:-1]).strip()
+        # Extract content, then remove section tags (e.g., <section_1_problem_essence>)
+        # and a leading/trailing separator (---). Each step returns the same string
+        # object when there is nothing to remove.
+        content = _SECTION_TAG_RE.sub('', summary[content_start:content_end])
+        content = _LEADING_SEP_RE.sub('', content)
+        content = _TRAILING_SEP_RE.sub('', content).strip()
         
         # Combine normalized header and content
         if content:  # Only add chunk if there's content
             chunk_text = normalized_header + "\n\n" + content
-            # Use section number as chunk_id (convert to int)
-            chunk_id = int(match_info['num'])
-            # Format as MongoDB document
+            # Format as MongoDB document (section number as chunk_id)
             chunks.append({
                 "qid": qid,
                 "chunk_id": chunk_id,
@@ -7,23 +7,30 @@ This module provides utility functions for querying and processing question IDs.
 import sys
 import re
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
 
 project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from chunks.config import sync_mongo_client
 
+# Searches the summary_text index can narrow: words of letters/digits separated by spaces
+WHOLE_WORDS_PATTERN = re.compile(r"[A-Za-z0-9]+(?: [A-Za-z0-9]+)*")
+
 
-def find_questions_by_summary_string(search_string: str, has_string: bool) -> list[int]:
+def find_questions_by_summary_string(
+    search_string: str, has_string: bool, whole_words: bool = False
+) -> list[int]:
     """
     Find question IDs based on whether their summary contains a specific string.
     
+    With whole_words=True the string only matches on word boundaries, and a search
+    made of whole alphanumeric words is narrowed by the summary_text index (created
+    in chunks/main.create_index) before the $regex confirms the exact match.
+    
     Args:
         search_string: The string to search for in the summary field
         has_string: If True, returns QIDs WITH the string. If False, returns QIDs WITHOUT the string.
+        whole_words: If True, only match the string as whole words rather than any substring
     
     Returns:
         List of question IDs (qids) matching the condition
@@ -33,10 +40,16 @@ def find_questions_by_summary_string(search_string: str, has_string: bool) -> li
     
     # Escape special regex characters in the search string
     escaped_string = re.escape(search_string)
+    if whole_words:
+        escaped_string = rf"\b{escaped_string}\b"
     
     # Build the query based on has_string flag
     if has_string:
         query = {"summary": {"$regex": escaped_string}}
+        # Every whole-word match contains the phrase's tokens, so the text index can
+        # only narrow the scan; the index uses no stemming or stop words
+        if whole_words and WHOLE_WORDS_PATTERN.fullmatch(search_string):
+            query["$text"] = {"$search": f'"{search_string}"'}
     else:
         query = {"summary": {"$not": {"$regex": escaped_string}}}
     
@@ -44,4 +57,4 @@ def find_questions_by_summary_string(search_string: str, has_string: bool) -> li
     cursor = summary_collection.find(query, {"qid": 1, "_id": 0})
     qids = [doc["qid"] for doc in cursor]
     
-    return qids
\ No newline at end of file
+    return qids
@@ -10,18 +10,16 @@ This script:
 import asyncio
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
 from pymongo import UpdateOne
 from typing import Dict, Set
 
 # Ensure the project root is on the Python path
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 from embeddings.config import async_mongo_client, db, logger
 
-load_dotenv()
-
 # Configuration
 EMBEDDINGS_COLLECTION = "embeddings"
 METADATA_COLLECTION = "question_metadata"
@@ -0,0 +1,256 @@
+"""Completion sources for the embeddings pipeline.
+
+A completion source answers "wait until this OpenAI file/batch reaches a terminal
+state" for the pipeline stages, so how completion is detected can change without
+touching the stages themselves.
+
+This module handles:
+- AsyncCompletionSource: the interface stages depend on
+- PollingCompletionSource: one coalesced polling loop shared by every waiter,
+  with per-item backoff (with jitter) and Retry-After handling
+- EventCompletionSource: completion pushed in from outside (e.g. a webhook handler)
+"""
+
+from __future__ import annotations
+
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Protocol, Tuple
+
+from embeddings.config import logger, POLL_BACKOFF_FACTOR
+from embeddings.openai_operations import RETRYABLE_API_ERRORS, retry_after_seconds
+from embeddings.stages.base_stage import jittered
+
+# (status, payload) reported once an item reaches a terminal state
+Outcome = Tuple[str, Any]
+
+# Polls an item once: (done, status, payload)
+CheckFn = Callable[[str], Awaitable[Tuple[bool, str, Any]]]
+
+
+class AsyncCompletionSource(Protocol):
+    """Something that can wait for an OpenAI object to reach a terminal state."""
+
+    async def wait_terminal(self, key: str) -> Outcome:
+        """Wait until `key` reaches a terminal state and return (status, payload)."""
+
+    async def close(self) -> None:
+        """Stop any background work and cancel outstanding waits."""
+
+
+@dataclass
+class _PendingPoll:
+    """A key that is still being polled, and everyone waiting on it."""
+
+    key: str
+    interval: float
+    next_poll_at: float
+    status: Optional[str] = None
+    waiters: List[asyncio.Future] = field(default_factory=list)
+
+
+class PollingCompletionSource:
+    """Completion source that polls every pending key from one background loop.
+
+    On each tick all keys whose next poll is due are checked in parallel (at most
+    `max_concurrent` requests at once). Each key backs off from `poll_interval` to
+    `max_poll_interval` while its status is unchanged, and starts over when the
+    status moves on. Rate limits and transient API errors are waited out, no
+    sooner than the server's Retry-After.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        check: CheckFn,
+        poll_interval: float,
+        max_poll_interval: float,
+        max_concurrent: int,
+    ) -> None:
+        self.name = name
+        self._check = check
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._pending: Dict[str, _PendingPoll] = {}
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    async def wait_terminal(self, key: str) -> Outcome:
+        """Wait until `key` reaches a terminal state and return (status, payload)."""
+        loop = asyncio.get_running_loop()
+
+        pending = self._pending.get(key)
+        if pending is None:
+            # First poll inline: keys that are already terminal (e.g. batches that
+            # completed while the pipeline was down) return without a hop through
+            # the polling loop
+            pending = _PendingPoll(key=key, interval=self.poll_interval, next_poll_at=loop.time())
+            outcome = await self._check_once(pending)
+            if outcome is not None:
+                return outcome
+            # Another waiter may have started polling the key in the meantime
+            pending = self._pending.setdefault(key, pending)
+
+        future = loop.create_future()
+        pending.waiters.append(future)
+
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._poll_loop(), name=f"{self.name}-poller")
+        self._wakeup.set()
+
+        try:
+            return await future
+        finally:
+            # A cancelled waiter stops counting towards its key
+            if future in pending.waiters:
+                pending.waiters.remove(future)
+            if not pending.waiters and self._pending.get(key) is pending:
+                del self._pending[key]
+
+    async def close(self) -> None:
+        """Stop the polling loop and cancel outstanding waits."""
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        for pending in list(self._pending.values()):
+            for future in pending.waiters:
+                future.cancel()
+        self._pending.clear()
+
+    def get_status(self) -> dict:
+        """Return a lightweight snapshot of what is being polled."""
+        return {"pending": len(self._pending)}
+
+    def _back_off(self, pending: _PendingPoll, status: Optional[str], min_delay: float = 0) -> None:
+        """Schedule the next poll, restarting from poll_interval when the status changes.
+
+        Args:
+            pending: Key to reschedule
+            status: Status from the latest poll
+            min_delay: Lower bound for the delay (e.g. a server Retry-After)
+        """
+        if pending.status is None or status != pending.status:
+            pending.interval = self.poll_interval
+        else:
+            pending.interval = min(pending.interval * POLL_BACKOFF_FACTOR, self.max_poll_interval)
+        pending.status = status
+        delay = max(jittered(pending.interval), min_delay)
+        pending.next_poll_at = asyncio.get_running_loop().time() + delay
+
+    def _resolve(self, pending: _PendingPoll, outcome: Optional[Outcome], error: Optional[BaseException] = None) -> None:
+        """Hand the terminal outcome (or error) to everyone waiting on the key."""
+        if self._pending.get(pending.key) is pending:
+            del self._pending[pending.key]
+        for future in pending.waiters:
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(outcome)
+
+    async def _check_once(self, pending: _PendingPoll) -> Optional[Outcome]:
+        """Poll one key and reschedule it, returning its outcome once terminal.
+
+        Rate limits and transient failures count as "not terminal yet"; any other
+        error is raised.
+        """
+        async with self._semaphore:
+            try:
+                done, status, payload = await self._check(pending.key)
+            except RETRYABLE_API_ERRORS as e:
+                # Rate limited / transient failure: wait at least as long as the
+                # server asked before polling the key again
+                retry_after = retry_after_seconds(e) or 0
+                logger.warning(
+                    f"{self.name}: Transient error polling {pending.key}: {e}; "
+                    f"retrying in at least {retry_after:.1f}s"
+                )
+                self._back_off(pending, pending.status, min_delay=retry_after)
+                return None
+
+        if done:
+            return status, payload
+        logger.debug(f"{self.name}: {pending.key} status={status}")
+        self._back_off(pending, status)
+        return None
+
+    async def _poll_one(self, pending: _PendingPoll) -> None:
+        """Poll one key from the loop; resolve its waiters once it is terminal."""
+        try:
+            outcome = await self._check_once(pending)
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"{self.name}: Error polling {pending.key}: {e}", exc_info=True)
+            self._resolve(pending, None, error=e)
+            return
+
+        if outcome is not None:
+            self._resolve(pending, outcome)
+
+    async def _poll_loop(self) -> None:
+        """Poll every key whose next poll is due; sleep until the next one otherwise."""
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                self._wakeup.clear()
+                now = loop.time()
+                due = [pending for pending in self._pending.values() if pending.next_poll_at <= now]
+                if due:
+                    await asyncio.gather(*(self._poll_one(pending) for pending in due))
+                    continue
+
+                # Sleep until the next key is due, waking early when a key is added
+                timeout = None
+                if self._pending:
+                    timeout = min(pending.next_poll_at for pending in self._pending.values()) - now
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        except asyncio.CancelledError:
+            # Graceful shutdown: allow the task to be cancelled cleanly
+            pass
+
+
+class EventCompletionSource:
+    """Completion source resolved from outside, e.g. by a webhook handler.
+
+    Waiters block on a future per key; `resolve` delivers the terminal outcome,
+    including for keys whose outcome arrives before anyone waits on them.
+    """
+
+    def __init__(self) -> None:
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    def _future(self, key: str) -> asyncio.Future:
+        future = self._futures.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._futures[key] = future
+        return future
+
+    async def wait_terminal(self, key: str) -> Outcome:
+        """Wait until `resolve(key, ...)` is called and return (status, payload)."""
+        try:
+            return await asyncio.shield(self._future(key))
+        finally:
+            future = self._futures.get(key)
+            if future is not None and future.done():
+                del self._futures[key]
+
+    def resolve(self, key: str, status: str, payload: Any = None) -> None:
+        """Report that `key` reached terminal `status` (called by the push handler)."""
+        future = self._future(key)
+        if not future.done():
+            future.set_result((status, payload))
+
+    async def close(self) -> None:
+        """Cancel outstanding waits."""
+        for future in self._futures.values():
+            future.cancel()
+        self._futures.clear()
@@ -1,12 +1,13 @@
 from dotenv import load_dotenv
 from pymongo import AsyncMongoClient, MongoClient
 import certifi
-from openai import AsyncOpenAI, OpenAI
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, OpenAI
 import os
 import logging
 from datetime import datetime
 
-# Load environment variables
+# Load environment variables (the only load_dotenv call in the embeddings package)
 load_dotenv()
 
 # ============================================================================
@@ -33,33 +34,89 @@ if not MONGODB_URL:
 # ============================================================================
 
 LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)
-log_filename = os.path.join(LOG_DIR, f"embeddings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
 
-# Configure logging to both file and console
+# Console logging only; long-running entry points opt into a log file with
+# configure_file_logging() so helper scripts don't each create an empty one
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
+    format=LOG_FORMAT,
     handlers=[
-        logging.FileHandler(log_filename),
         logging.StreamHandler()
     ]
 )
 
+
+def configure_file_logging() -> str:
+    """
+    Also write logs to a timestamped file under LOG_DIR.
+    
+    Returns:
+        Path of the log file
+    """
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_filename = os.path.join(LOG_DIR, f"embeddings_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+    
+    file_handler = logging.FileHandler(log_filename)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    logging.getLogger().addHandler(file_handler)
+    return log_filename
+
 logger = logging.getLogger(__name__)
 
 # ============================================================================
 # OpenAI EmbeddingsClient
 # ============================================================================
-async_embeddings_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-sync_embeddings_client = OpenAI(api_key=OPENAI_API_KEY)
+# Every stage shares one async client. HTTP/2 multiplexes concurrent uploads and
+# status polls over a few connections instead of a TLS connection per request
+# (needs the `h2` package). DefaultAsyncHttpxClient keeps the SDK's timeouts.
+OPENAI_HTTP_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=50)
+
+async_embeddings_client = AsyncOpenAI(
+    api_key=OPENAI_API_KEY,
+    http_client=DefaultAsyncHttpxClient(http2=True, limits=OPENAI_HTTP_LIMITS),
+)
+_sync_embeddings_client = None
+
+
+def get_sync_embeddings_client() -> OpenAI:
+    """Return the sync OpenAI client, creating it on first use."""
+    global _sync_embeddings_client
+    if _sync_embeddings_client is None:
+        _sync_embeddings_client = OpenAI(api_key=OPENAI_API_KEY)
+    return _sync_embeddings_client
+
 # ============================================================================
 # MongoDB Client & Collections
 # ============================================================================
-async_mongo_client = AsyncMongoClient(MONGODB_URL, tlsCAFile=certifi.where())
-sync_mongo_client = MongoClient(MONGODB_URL, tlsCAFile=certifi.where())
+# Embedding upserts are large (1024 floats per document), so compress on the
+# wire and cap the pool so concurrent stages queue for connections instead of
+# opening ~100 sockets. zstd needs the `zstandard` package; the server falls
+# back to zlib (or no compression) if it cannot negotiate zstd.
+MONGO_CLIENT_OPTIONS = {
+    "tlsCAFile": certifi.where(),
+    "maxPoolSize": 50,
+    "compressors": "zstd,zlib",
+    "zlibCompressionLevel": 3,
+    "retryWrites": True,
+}
+
+async_mongo_client = AsyncMongoClient(MONGODB_URL, **MONGO_CLIENT_OPTIONS)
 db = async_mongo_client["leetcode_questions"]
 
+# The pipeline is fully async; a sync client (and its connection pool and
+# monitor threads) is only created if a sync-only script asks for one.
+_sync_mongo_client = None
+
+
+def get_sync_mongo_client() -> MongoClient:
+    """Return the sync MongoDB client, creating it on first use."""
+    global _sync_mongo_client
+    if _sync_mongo_client is None:
+        _sync_mongo_client = MongoClient(MONGODB_URL, **MONGO_CLIENT_OPTIONS)
+    return _sync_mongo_client
+
+
 # Problem data collections
 collections = {
     "metadata": db["question_metadata"],
@@ -83,13 +140,22 @@ embeddings_file_metadata_collection = db["embeddings_file_metadata"]
 EMBEDDING_MODEL = "text-embedding-3-large"
 EMBEDDING_DIMENSIONS = 1024
 
+# Atlas Vector Search index over the embeddings collection (queried by
+# init_rag_model_testing). "scalar" quantization keeps an int8 copy of each
+# vector in the index, a quarter of the float32 size.
+VECTOR_INDEX_NAME = "summary_chunk_embeddings"
+VECTOR_INDEX_SIMILARITY = "cosine"
+VECTOR_INDEX_QUANTIZATION = "scalar"
+
 # ============================================================================
 # Batch API Configuration
 # ============================================================================
 
 EMBEDDING_BATCH_SIZE = "5000"  # Number of chunks per batch
 MAX_CONCURRENT_EMBEDDING_BATCH_SUBMISSIONS = "2"
-EMBEDDING_POLL_INTERVAL = "60"  # Seconds between polling
+EMBEDDING_POLL_INTERVAL = "30"  # Seconds before the first re-poll of a batch
+EMBEDDING_MAX_POLL_INTERVAL = "600"  # Upper bound for the backed-off polling interval
+POLL_BACKOFF_FACTOR = 1.5  # Polling interval growth per unchanged status
 
 # ============================================================================
 # Pipeline Configuration
@@ -103,4 +169,9 @@ MAX_CONCURRENT_FILE_UPLOADS = 5
 MAX_CONCURRENT_FILE_POLLING = 5
 MAX_CONCURRENT_BATCH_CREATIONS = 5
 MAX_CONCURRENT_BATCH_POLLING = 5
-MAX_CONCURRENT_EMBEDDING_UPLOADS = 5
\ No newline at end of file
+MAX_CONCURRENT_EMBEDDING_UPLOADS = 5
+
+# Input queue bound for the polling stages; other stages queue max_concurrent * 4
+# items. Polled items are just IDs, and their dispatcher takes them off the queue
+# right away, so they get a much larger bound than stages that carry JSONL payloads
+POLLING_QUEUE_MAXSIZE = 1000
\ No newline at end of file
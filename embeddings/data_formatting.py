@@ -3,15 +3,81 @@ Data formatting module for embeddings.
 
 This module handles:
 - Converting chunks to JSONL format for OpenAI batch API
+- Serializing any Batch API request rows to JSONL bytes (build_batch_jsonl)
+- Validating JSONL batch content before it is uploaded
 """
 
-import json
-from typing import List, Dict, Tuple
+import asyncio
+import orjson
+from typing import Dict, Iterable, Iterator, List, Tuple
 
 from embeddings.config import EMBEDDING_MODEL, EMBEDDING_DIMENSIONS, EMBEDDING_BATCH_SIZE
 
+# Request fields that are the same for every chunk
+_REQUEST_BODY_TEMPLATE = {
+    "model": EMBEDDING_MODEL,
+    "encoding_format": "float",
+    "dimensions": EMBEDDING_DIMENSIONS,
+}
+_CUSTOM_ID_FORMAT = "qid-%d-chunk-%d"
 
-def chunks_to_jsonl_content(chunks: List[Dict], batch_size: int = None) -> List[Tuple[List[Tuple[int, int]], str]]:
+
+def build_batch_jsonl(rows: Iterable[Dict]) -> bytes:
+    """
+    Serialize Batch API request rows to JSONL bytes with orjson.
+    
+    Each row is encoded (with its newline) straight into one buffer, so rows may be
+    a generator that reuses and mutates a single dict between yields.
+    
+    Args:
+        rows: Request dicts, one per JSONL line
+    
+    Returns:
+        JSONL content as UTF-8 bytes (no trailing newline)
+    """
+    buf = bytearray()
+    write_line = buf.extend
+    for row in rows:
+        write_line(orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE))
+    
+    # Drop the trailing newline after the last line
+    if buf:
+        del buf[-1]
+    return bytes(buf)
+
+
+def _build_one_batch(batch_chunks: List[Dict]) -> Tuple[List[Tuple[int, int]], bytes]:
+    """
+    Serialize one batch of chunks to JSONL.
+    
+    Args:
+        batch_chunks: List of chunk dicts [{"qid": int, "chunk_id": int, "text": str}, ...]
+    
+    Returns:
+        Tuple: (list of (qid, chunk_id) tuples in batch, JSONL content as UTF-8 bytes)
+    """
+    chunk_ids = [(chunk["qid"], chunk["chunk_id"]) for chunk in batch_chunks]
+    
+    # One request dict reused for every line; only custom_id and input change per chunk.
+    # It is built per batch so batches can be serialized on separate threads.
+    request_body = {"input": None, **_REQUEST_BODY_TEMPLATE}
+    request_data = {
+        "custom_id": None,
+        "method": "POST",
+        "url": "/v1/embeddings",
+        "body": request_body,
+    }
+    
+    def requests() -> Iterator[Dict]:
+        for chunk in batch_chunks:
+            request_data["custom_id"] = _CUSTOM_ID_FORMAT % (chunk["qid"], chunk["chunk_id"])
+            request_body["input"] = chunk["text"]
+            yield request_data
+    
+    return chunk_ids, build_batch_jsonl(requests())
+
+
+def chunks_to_jsonl_content(chunks: List[Dict], batch_size: int = None) -> List[Tuple[List[Tuple[int, int]], bytes]]:
     """
     Create JSONL content in memory for batch embedding processing.
     This is a synchronous function as it only performs in-memory data transformation.
@@ -21,34 +87,89 @@ def chunks_to_jsonl_content(chunks: List[Dict], batch_size: int = None) -> List[
         batch_size: Number of requests per batch (defaults to EMBEDDING_BATCH_SIZE)
     
     Returns:
-        List of tuples: (list of (qid, chunk_id) tuples in batch, JSONL content string)
+        List of tuples: (list of (qid, chunk_id) tuples in batch, JSONL content as UTF-8 bytes)
     """
     if batch_size is None:
         batch_size = int(EMBEDDING_BATCH_SIZE)
     
-    batches = []
+    return [
+        _build_one_batch(chunks[i:i + batch_size])
+        for i in range(0, len(chunks), batch_size)
+    ]
+
+
+async def build_batches_async(chunks: List[Dict], batch_size: int = None) -> List[Tuple[List[Tuple[int, int]], bytes]]:
+    """
+    Async version of chunks_to_jsonl_content that serializes each batch in its own
+    worker thread, keeping the event loop free while the JSONL is built.
     
-    for i in range(0, len(chunks), batch_size):
-        batch_chunks = chunks[i:i + batch_size]
-        chunk_ids = [(chunk["qid"], chunk["chunk_id"]) for chunk in batch_chunks]
-        
-        # Create JSONL content
-        jsonl_lines = []
-        for chunk in batch_chunks:
-            request_data = {
-                "custom_id": f"qid-{chunk['qid']}-chunk-{chunk['chunk_id']}",
-                "method": "POST",
-                "url": "/v1/embeddings",
-                "body": {
-                    "input": chunk["text"],
-                    "model": EMBEDDING_MODEL,
-                    "encoding_format": "float",
-                    "dimensions": EMBEDDING_DIMENSIONS,
-                },
-            }
-            jsonl_lines.append(json.dumps(request_data))
+    Args:
+        chunks: List of chunk dicts [{"qid": int, "chunk_id": int, "text": str}, ...]
+        batch_size: Number of requests per batch (defaults to EMBEDDING_BATCH_SIZE)
+    
+    Returns:
+        List of tuples: (list of (qid, chunk_id) tuples in batch, JSONL content as UTF-8 bytes),
+        in the same order as chunks_to_jsonl_content
+    """
+    if batch_size is None:
+        batch_size = int(EMBEDDING_BATCH_SIZE)
+    
+    slices = [chunks[i:i + batch_size] for i in range(0, len(chunks), batch_size)]
+    return list(await asyncio.gather(
+        *(asyncio.to_thread(_build_one_batch, batch_chunks) for batch_chunks in slices)
+    ))
+
+
+class BadBatchError(ValueError):
+    """Raised when a JSONL batch would be rejected (or partly fail) in the Batch API."""
+
+    def __init__(self, message: str, chunk_ids: List[Tuple[int, int]]):
+        super().__init__(message)
+        self.chunk_ids = chunk_ids
+
+
+def validate_jsonl_content(chunk_ids: List[Tuple[int, int]], jsonl_content: bytes) -> None:
+    """
+    Check a JSONL batch before it is uploaded.
+    
+    A bad line only surfaces once the batch has been validated (or run) by OpenAI,
+    so each line is parsed back and checked against the chunk it should hold:
+    valid JSON, the expected (and therefore unique) custom_id, and a non-empty input.
+    
+    Args:
+        chunk_ids: List of (qid, chunk_id) tuples the batch was built from
+        jsonl_content: JSONL content as UTF-8 bytes
+    
+    Raises:
+        BadBatchError: If the batch is malformed; chunk_ids holds the offending chunks
+    """
+    lines = jsonl_content.split(b"\n") if jsonl_content else []
+    if len(lines) != len(chunk_ids):
+        raise BadBatchError(
+            f"Batch has {len(lines)} lines for {len(chunk_ids)} chunks", chunk_ids
+        )
+    
+    bad_chunk_ids = []
+    seen_custom_ids = set()
+    for (qid, chunk_id), line in zip(chunk_ids, lines):
+        try:
+            request = orjson.loads(line)
+        except orjson.JSONDecodeError:
+            bad_chunk_ids.append((qid, chunk_id))
+            continue
         
-        jsonl_content = "\n".join(jsonl_lines)
-        batches.append((chunk_ids, jsonl_content))
+        custom_id = request.get("custom_id")
+        text = request.get("body", {}).get("input")
+        if (
+            custom_id != _CUSTOM_ID_FORMAT % (qid, chunk_id)
+            or custom_id in seen_custom_ids
+            or not isinstance(text, str)
+            or not text.strip()
+        ):
+            bad_chunk_ids.append((qid, chunk_id))
+        seen_custom_ids.add(custom_id)
     
-    return batches
+    if bad_chunk_ids:
+        raise BadBatchError(
+            f"{len(bad_chunk_ids)} invalid requests in batch of {len(chunk_ids)}", bad_chunk_ids
+        )
@@ -2,26 +2,23 @@
 Script to extract all unique tags from the question_metadata collection.
 
 This script:
-- Iterates through all documents in question_metadata collection
-- Extracts all topics/tags from each document
-- Builds a set of unique tags
+- Asks MongoDB for the distinct topics/tags across question_metadata
+- Builds a set of unique (non-empty) tags
 - Outputs the results
 """
 
 import asyncio
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
 from typing import Set
 
 # Ensure the project root is on the Python path
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 from embeddings.config import async_mongo_client, db, logger
 
-load_dotenv()
-
 # Configuration
 METADATA_COLLECTION = "question_metadata"
 
@@ -37,23 +34,10 @@ async def get_all_unique_tags() -> Set[str]:
     
     logger.info("Extracting unique tags from question_metadata collection...")
     
-    unique_tags: Set[str] = set()
-    total_documents = 0
-    
-    # Iterate through all metadata documents
-    cursor = metadata_collection.find({}, {"topics": 1})
-    
-    async for doc in cursor:
-        total_documents += 1
-        topics = doc.get("topics", [])
-        
-        if topics:
-            # Add all topics to the set
-            for topic in topics:
-                if topic:  # Skip empty strings
-                    unique_tags.add(topic)
+    # distinct unwinds the topics arrays server-side and returns each tag once
+    tags = await metadata_collection.distinct("topics", {"topics": {"$ne": None}})
+    unique_tags: Set[str] = {tag for tag in tags if tag}  # Skip empty strings
     
-    logger.info(f"Processed {total_documents} documents")
     logger.info(f"Found {len(unique_tags)} unique tags")
     
     return unique_tags
@@ -72,9 +56,8 @@ async def main() -> None:
         print(f"Unique Tags in Database: {len(sorted_tags)}")
         print("=" * 80)
         
-        # Print tags in columns for better readability
-        for i, tag in enumerate(sorted_tags, 1):
-            print(f"{i:4d}. {tag}")
+        # Print tags in columns for better readability (one write for the whole list)
+        sys.stdout.write("".join(f"{i:4d}. {tag}\n" for i, tag in enumerate(sorted_tags, 1)))
         
         print("\n" + "=" * 80)
         print(f"Total unique tags: {len(sorted_tags)}")
@@ -82,9 +65,7 @@ async def main() -> None:
         
         # Also save to a file
         output_file = "unique_tags.txt"
-        with open(output_file, "w") as f:
-            for tag in sorted_tags:
-                f.write(f"{tag}\n")
+        Path(output_file).write_text("".join(f"{tag}\n" for tag in sorted_tags), encoding="utf-8")
         
         logger.info(f"Tags saved to {output_file}")
         
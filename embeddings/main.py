@@ -1,8 +1,9 @@
 """Main script for the embeddings pipeline.
 
 This script orchestrates the complete embeddings pipeline:
-FileUploadStage → FilePollingStage → BatchCreationStage → 
-BatchPollingStage → EmbeddingUploadStage
+FileUploadStage → FilePollingStage → BatchLifecycleStage
+(BatchLifecycleStage runs BatchCreationStage → BatchPollingStage →
+EmbeddingUploadStage logic in one coroutine per batch)
 
 Flow:
 1. Fetch up to MAX_CHUNKS_PER_ITERATION chunks without batches
@@ -17,16 +18,21 @@ from __future__ import annotations
 
 import asyncio
 import sys
-from pathlib import Path
 
-from dotenv import load_dotenv
+try:
+    import uvloop
+except ImportError:  # uvloop is unavailable on Windows
+    uvloop = None
+from pathlib import Path
 
 # Ensure the project root is on the Python path
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 from embeddings.config import (
     async_mongo_client,
+    configure_file_logging,
     logger,
     EMBEDDING_BATCH_SIZE,
     MAX_CHUNKS_PER_ITERATION,
@@ -35,30 +41,41 @@ from embeddings.config import (
     MAX_CONCURRENT_BATCH_CREATIONS,
     MAX_CONCURRENT_BATCH_POLLING,
     MAX_CONCURRENT_EMBEDDING_UPLOADS,
+    POLLING_QUEUE_MAXSIZE,
+)
+from embeddings.mongo_operations import (
+    backfill_embedded_flags,
+    ensure_indexes,
+    ensure_vector_search_index,
+    get_chunks_without_batches,
+    get_incomplete_batch_ids,
+)
+from embeddings.data_formatting import (  # noqa: E402
+    BadBatchError,
+    build_batches_async,
+    validate_jsonl_content,
 )
-from embeddings.mongo_operations import get_chunks_without_batches, get_incomplete_batch_ids
-from embeddings.data_formatting import chunks_to_jsonl_content  # noqa: E402
 from embeddings.pipeline import EmbeddingPipeline  # noqa: E402
 from embeddings.stages.file_upload_stage import FileUploadStage  # noqa: E402
 from embeddings.stages.file_polling_stage import FilePollingStage  # noqa: E402
 from embeddings.stages.batch_creation_stage import BatchCreationStage  # noqa: E402
 from embeddings.stages.batch_polling_stage import BatchPollingStage  # noqa: E402
 from embeddings.stages.embedding_upload_stage import EmbeddingUploadStage  # noqa: E402
-
-
-# Load environment variables
-load_dotenv()
+from embeddings.stages.batch_lifecycle_stage import BatchLifecycleStage  # noqa: E402
 
 
 async def main() -> None:
     """Test harness for the embeddings pipeline.
 
-    This sets up a pipeline with FileUploadStage, FilePollingStage,
-    BatchCreationStage, and BatchPollingStage and repeatedly:
+    This sets up a pipeline with FileUploadStage, FilePollingStage and
+    BatchLifecycleStage (batch creation, polling and embedding upload) and repeatedly:
     - pulls a window of chunks without batches from MongoDB,
     - splits them into JSONL batches, and
     - enqueues those batches into the pipeline.
     """
+    log_filename = configure_file_logging()
+    logger.info("[Main] Logging to %s", log_filename)
+
     # Create and configure the pipeline
     pipeline = EmbeddingPipeline()
 
@@ -73,31 +90,37 @@ async def main() -> None:
     file_polling_stage = FilePollingStage(
         name="file-polling",
         max_concurrent=MAX_CONCURRENT_FILE_POLLING,
+        queue_maxsize=POLLING_QUEUE_MAXSIZE,
     )
     pipeline.add_stage(file_polling_stage)
 
-    # Add the batch creation stage (chains after file polling)
-    batch_creation_stage = BatchCreationStage(
-        name="batch-creation",
-        max_concurrent=MAX_CONCURRENT_BATCH_CREATIONS,
-    )
-    pipeline.add_stage(batch_creation_stage)
-
-    # Add the batch polling stage (chains after batch creation)
-    batch_polling_stage = BatchPollingStage(
-        name="batch-polling",
-        max_concurrent=MAX_CONCURRENT_BATCH_POLLING,
-    )
-    pipeline.add_stage(batch_polling_stage)
-
-    # Add the embedding upload stage (chains after batch polling)
-    embedding_upload_stage = EmbeddingUploadStage(
-        name="embedding-upload",
-        max_concurrent=MAX_CONCURRENT_EMBEDDING_UPLOADS,
+    # Add the batch lifecycle stage (chains after file polling): batch creation,
+    # batch polling and embedding upload run in one coroutine per batch
+    batch_lifecycle_stage = BatchLifecycleStage(
+        name="batch-lifecycle",
+        creation=BatchCreationStage(
+            name="batch-creation",
+            max_concurrent=MAX_CONCURRENT_BATCH_CREATIONS,
+        ),
+        polling=BatchPollingStage(
+            name="batch-polling",
+            max_concurrent=MAX_CONCURRENT_BATCH_POLLING,
+        ),
+        upload=EmbeddingUploadStage(
+            name="embedding-upload",
+            max_concurrent=MAX_CONCURRENT_EMBEDDING_UPLOADS,
+        ),
+        queue_maxsize=POLLING_QUEUE_MAXSIZE,
     )
-    pipeline.add_stage(embedding_upload_stage)
+    pipeline.add_stage(batch_lifecycle_stage)
 
     try:
+        # Make sure chunk lookups are indexed and chunks from earlier batches
+        # are flagged before anything is fetched
+        await ensure_indexes()
+        await ensure_vector_search_index()
+        await backfill_embedded_flags()
+
         # Start the pipeline (starts all stage workers)
         logger.info("[Main] Starting pipeline...")
         await pipeline.start()
@@ -109,16 +132,17 @@ async def main() -> None:
                 "[Main] Resuming %d incomplete batches from previous run",
                 len(incomplete_batch_ids),
             )
-            batch_polling_stage = pipeline.get_stage_by_name("batch-polling")
-            if batch_polling_stage is None:
+            batch_lifecycle_stage = pipeline.get_stage_by_name("batch-lifecycle")
+            if batch_lifecycle_stage is None:
                 logger.warning(
-                    "[Main] Could not find batch-polling stage to resume batches"
+                    "[Main] Could not find batch-lifecycle stage to resume batches"
                 )
             else:
+                # A bare batch_id skips creation and resumes at polling
                 for batch_id in incomplete_batch_ids:
-                    await batch_polling_stage.enqueue(batch_id)
+                    await batch_lifecycle_stage.enqueue(batch_id)
                 logger.info(
-                    "[Main] Enqueued %d incomplete batches to batch-polling stage",
+                    "[Main] Enqueued %d incomplete batches to batch-lifecycle stage",
                     len(incomplete_batch_ids),
                 )
         else:
@@ -129,8 +153,11 @@ async def main() -> None:
         while True:
             # 1. Fetch up to MAX_CHUNKS_PER_ITERATION chunks that do not yet
             #    belong to any embeddings batch.
+            #    Chunks already enqueued in this run that are not in a stored batch
+            #    yet (e.g. their file upload failed) are excluded so they aren't resent.
             chunks_without_batches = await get_chunks_without_batches(
-                limit=MAX_CHUNKS_PER_ITERATION
+                limit=MAX_CHUNKS_PER_ITERATION,
+                exclude_pairs=pipeline.inflight_chunk_ids,
             )
             if not chunks_without_batches:
                 logger.info("[Main] No more chunks without batches. Exiting loop.")
@@ -143,9 +170,11 @@ async def main() -> None:
             )
 
             # 2. Turn chunks into JSONL batches of size EMBEDDING_BATCH_SIZE
-            batch_contents = chunks_to_jsonl_content(
+            #    Serialization is CPU-bound, so each batch is built in a worker
+            #    thread to keep in-flight uploads and polling moving on the event loop.
+            batch_contents = await build_batches_async(
                 chunks_without_batches,
-                batch_size=int(EMBEDDING_BATCH_SIZE),
+                int(EMBEDDING_BATCH_SIZE),
             )
             logger.info(
                 "[Main] Created %d JSONL batches from %d chunks (batch_size=%d)",
@@ -158,15 +187,36 @@ async def main() -> None:
                 logger.info("[Main] No batch contents created; breaking loop.")
                 break
 
-            # 3. Enqueue each batch into the pipeline (goes to first stage)
+            # 3. Enqueue each valid batch into the pipeline (goes to first stage).
+            #    A malformed batch would only fail after upload and validation on
+            #    OpenAI's side, so it is skipped here and its chunks are logged.
+            batches_enqueued = 0
             for chunk_ids, jsonl_content in batch_contents:
+                try:
+                    validate_jsonl_content(chunk_ids, jsonl_content)
+                except BadBatchError as exc:
+                    logger.error(
+                        "[Main] Skipping batch of %d chunks: %s. Offending (qid, chunk_id): %s",
+                        len(chunk_ids),
+                        exc,
+                        exc.chunk_ids[:20],
+                    )
+                    continue
+
+                pipeline.mark_inflight(chunk_ids)
                 await pipeline.enqueue((chunk_ids, jsonl_content))
-                total_batches_enqueued += 1
+                batches_enqueued += 1
+            total_batches_enqueued += batches_enqueued
+
+            if not batches_enqueued:
+                # Skipped chunks stay unbatched, so the next fetch would return them again
+                logger.error("[Main] Every batch in this iteration was invalid; breaking loop.")
+                break
 
             logger.info(
                 "[Main] Enqueued %d batches into pipeline; waiting for queue to drain "
                 "before fetching more chunks...",
-                len(batch_contents),
+                batches_enqueued,
             )
 
             # 4. Wait until all currently enqueued items are processed
@@ -197,4 +247,9 @@ async def main() -> None:
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    # uvloop's event loop cuts the per-callback overhead of the many small awaits
+    # (queue hand-offs, HTTP and MongoDB calls) the pipeline is made of
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())
@@ -2,15 +2,22 @@
 MongoDB operations module for embeddings.
 
 This module handles:
+- Creating indexes used by the embeddings pipeline
+- Creating the (quantized) vector search index over the embeddings
 - Fetching chunks without batches
-- Storing batch metadata
+- Flagging chunks that belong to a batch
+- Storing file and batch metadata
 - Getting incomplete batch IDs
 - Uploading embeddings to MongoDB
 """
 
-from typing import List, Dict, Tuple
-from datetime import datetime
-from pymongo import ReplaceOne
+from typing import List, Dict, Set, Tuple
+from datetime import datetime, timezone
+import numpy as np
+from bson.binary import Binary, BinaryVectorDtype, VECTOR_SUBTYPE
+from pymongo import UpdateMany, UpdateOne
+from pymongo.operations import SearchIndexModel
+from pymongo.errors import BulkWriteError
 
 from embeddings.config import (
     logger,
@@ -18,61 +25,200 @@ from embeddings.config import (
     embeddings_batch_metadata_collection,
     embeddings_file_metadata_collection,
     db,
+    EMBEDDING_DIMENSIONS,
+    VECTOR_INDEX_NAME,
+    VECTOR_INDEX_SIMILARITY,
+    VECTOR_INDEX_QUANTIZATION,
 )
 
-# this is still pretty inefficient, but idrc enough to fix it
-async def get_chunks_without_batches(limit: int = 10000) -> List[Dict]:
+# BSON binary vector header: dtype byte followed by a padding byte (0 for float32)
+_FLOAT32_VECTOR_HEADER = BinaryVectorDtype.FLOAT32.value + b"\x00"
+
+
+async def ensure_indexes() -> None:
+    """
+    Create the indexes the embeddings pipeline queries on, if they are missing.
+    
+    Existing indexes are checked first (via index_information), so the index specs
+    are only sent to the server when an index is actually missing.
+    """
+    indexes = [
+        (collections["chunks"], [("embedded", 1)], {"name": "embedded_1"}),
+        # Embedding upserts are keyed on (qid, chunk_id)
+        (db["embeddings"], [("qid", 1), ("chunk_id", 1)], {"unique": True, "name": "qid_chunk_id_unique"}),
+        # Metadata status updates are keyed on the OpenAI IDs
+        (embeddings_batch_metadata_collection, [("batch_id", 1)], {"unique": True, "name": "batch_id_unique"}),
+        (embeddings_file_metadata_collection, [("file_id", 1)], {"unique": True, "name": "file_id_unique"}),
+    ]
+    
+    for collection, keys, options in indexes:
+        try:
+            existing_indexes = await collection.index_information()
+            if any(index["key"] == keys for index in existing_indexes.values()):
+                logger.debug(f"Index {options['name']} on {collection.name} already exists")
+                continue
+            
+            await collection.create_index(keys, background=True, **options)
+            logger.info(f"Created index {options['name']} on {collection.name}")
+        except Exception as e:
+            logger.warning(f"Could not create index {options['name']} on {collection.name}: {e}")
+
+
+async def ensure_vector_search_index() -> None:
+    """
+    Create the Atlas Vector Search index over the embeddings, if it is missing.
+    
+    Embeddings are stored as full float32 vectors; the index is built with scalar
+    quantization, so Atlas keeps int8 copies for the graph (a quarter of the
+    memory) and can still rescore against the stored float32 vectors. The query
+    vector stays float32. An existing index is left as it is, since changing its
+    definition makes Atlas rebuild it; a missing quantization is only logged.
+    """
+    embeddings_collection = db["embeddings"]
+    try:
+        cursor = await embeddings_collection.list_search_indexes(VECTOR_INDEX_NAME)
+        existing = await cursor.to_list(length=1)
+        if existing:
+            fields = existing[0].get("latestDefinition", {}).get("fields", [])
+            if not any(field.get("quantization") == VECTOR_INDEX_QUANTIZATION for field in fields):
+                logger.warning(
+                    f"Vector search index {VECTOR_INDEX_NAME} exists without "
+                    f"{VECTOR_INDEX_QUANTIZATION} quantization; leaving it unchanged"
+                )
+            return
+        
+        await embeddings_collection.create_search_index(
+            SearchIndexModel(
+                definition={
+                    "fields": [
+                        {
+                            "type": "vector",
+                            "path": "embedding",
+                            "numDimensions": EMBEDDING_DIMENSIONS,
+                            "similarity": VECTOR_INDEX_SIMILARITY,
+                            "quantization": VECTOR_INDEX_QUANTIZATION,
+                        }
+                    ]
+                },
+                name=VECTOR_INDEX_NAME,
+                type="vectorSearch",
+            )
+        )
+        logger.info(f"Created vector search index {VECTOR_INDEX_NAME} on {embeddings_collection.name}")
+    except Exception as e:
+        logger.warning(f"Could not create vector search index {VECTOR_INDEX_NAME}: {e}")
+
+
+def _group_by_qid(chunk_ids) -> Dict[int, List[int]]:
+    """Group (qid, chunk_id) pairs into {qid: [chunk_id, ...]}."""
+    chunk_ids_by_qid: Dict[int, List[int]] = {}
+    for qid, chunk_id in chunk_ids:
+        chunk_ids_by_qid.setdefault(qid, []).append(chunk_id)
+    return chunk_ids_by_qid
+
+
+def _embedded_flag_updates(batch_id: str, chunk_ids: List[Tuple[int, int]], unflagged_only: bool = False) -> List[UpdateMany]:
+    """
+    Build the updates that flag the given chunks as belonging to a batch.
+    
+    Pairs are grouped by qid, giving one UpdateMany per question (with chunk_id $in)
+    rather than one update per chunk; each one resolves on the (qid, chunk_id) index.
+    
+    Args:
+        batch_id: OpenAI batch ID the chunks were submitted in
+        chunk_ids: List of (qid, chunk_id) tuples
+        unflagged_only: Only touch chunks that are not flagged yet
+    
+    Returns:
+        List of UpdateMany operations for bulk_write
+    """
+    update = {"$set": {"embedded": True, "batch_id": batch_id}}
+    operations = []
+    for qid, ids in _group_by_qid(chunk_ids).items():
+        filter_doc = {"qid": qid, "chunk_id": {"$in": ids}}
+        if unflagged_only:
+            filter_doc["embedded"] = {"$ne": True}
+        operations.append(UpdateMany(filter_doc, update))
+    return operations
+
+
+async def mark_chunks_embedded(batch_id: str, chunk_ids: List[Tuple[int, int]]) -> int:
+    """
+    Flag chunks as belonging to an embeddings batch.
+    
+    Args:
+        batch_id: OpenAI batch ID the chunks were submitted in
+        chunk_ids: List of (qid, chunk_id) tuples in the batch
+    
+    Returns:
+        Number of chunk documents that were modified
+    """
+    operations = _embedded_flag_updates(batch_id, chunk_ids)
+    if not operations:
+        return 0
+    
+    result = await collections["chunks"].bulk_write(operations, ordered=False)
+    return result.modified_count
+
+
+async def backfill_embedded_flags() -> None:
+    """
+    Set the `embedded` flag on chunks that already appear in batch metadata.
+    
+    Chunks batched before the flag existed (or whose flag write was interrupted
+    after the batch metadata was stored) would otherwise be picked up again by
+    get_chunks_without_batches. Already-flagged chunks are skipped, so this is
+    cheap to run on every startup.
+    """
+    total_marked = 0
+    cursor = embeddings_batch_metadata_collection.find({}, {"batch_id": 1, "chunk_ids": 1, "_id": 0})
+    async for batch in cursor:
+        operations = _embedded_flag_updates(
+            batch["batch_id"], batch.get("chunk_ids", []), unflagged_only=True
+        )
+        if not operations:
+            continue
+        
+        result = await collections["chunks"].bulk_write(operations, ordered=False)
+        total_marked += result.modified_count
+    
+    if total_marked:
+        logger.info(f"Backfilled embedded flag on {total_marked} chunks from batch metadata")
+
+
+async def get_chunks_without_batches(limit: int = 10000, exclude_pairs: Set[Tuple[int, int]] = None) -> List[Dict]:
     """
     Get chunks from MongoDB that don't have corresponding batches yet.
     Limited to `limit` chunks for incremental processing.
 
-    This implementation pushes the exclusion logic into MongoDB using an
-    aggregation pipeline with $lookup and $expr, instead of loading all
-    batch metadata into memory and diffing in Python.
+    Chunks are flagged with `embedded: True` when their batch metadata is
+    stored, so this is a single indexed find on that flag. The cursor pulls
+    1000 documents per round trip instead of the driver default of 101.
 
     Args:
         limit: Maximum number of chunks to return (default: 10000)
+        exclude_pairs: Optional (qid, chunk_id) pairs to leave out, e.g. chunks the
+            pipeline already holds that are not flagged yet
 
     Returns:
         List of chunk documents: [{"qid": int, "chunk_id": int, "text": str}, ...]
     """
-    logger.info(f"Fetching up to {limit} chunks without batches via aggregation...")
+    logger.info(f"Fetching up to {limit} chunks without batches...")
 
-    pipeline = [
-        {
-            "$lookup": {
-                "from": "embeddings_batch_metadata",
-                "let": {"qid": "$qid", "chunk_id": "$chunk_id"},
-                "pipeline": [
-                    {
-                        "$match": {
-                            "$expr": {
-                                # Check if [qid, chunk_id] appears in batch.chunk_ids
-                                "$in": [["$$qid", "$$chunk_id"], "$chunk_ids"]
-                            }
-                        }
-                    }
-                ],
-                "as": "batches",
-            }
-        },
-        # Keep only chunks that have NO matching batch (batches array is empty)
-        {"$match": {"batches": {"$size": 0}}},
-        # Limit for incremental processing
-        {"$limit": limit},
-        # Only return the fields we care about
-        {"$project": {"qid": 1, "chunk_id": 1, "text": 1, "_id": 0}},
-    ]
-
-    # aggregate(...) is async in the PyMongo async client, so we must await it
-    cursor = await collections["chunks"].aggregate(pipeline)
-    chunks_without_batches: List[Dict] = []
+    query = {"embedded": {"$ne": True}}
+    if exclude_pairs:
+        query["$nor"] = [
+            {"qid": qid, "chunk_id": {"$in": ids}}
+            for qid, ids in _group_by_qid(exclude_pairs).items()
+        ]
 
-    async for doc in cursor:
-        chunks_without_batches.append(doc)
+    chunks_without_batches = await collections["chunks"].find(
+        query,
+        {"qid": 1, "chunk_id": 1, "text": 1, "_id": 0},
+    ).limit(limit).batch_size(1000).to_list(length=limit)
 
     logger.info(
-        f"Aggregation found {len(chunks_without_batches)} chunks without batches "
+        f"Found {len(chunks_without_batches)} chunks without batches "
         f"(limit={limit})"
     )
     return chunks_without_batches
@@ -94,7 +240,7 @@ async def store_batch_metadata(batch_id: str, file_id: str, chunk_ids: List[Tupl
         "openai_file_id": file_id,
         "status": status,
         "chunk_ids": chunk_ids,
-        "created_at": datetime.utcnow(),
+        "created_at": datetime.now(timezone.utc),
         "processed": False
     }
     
@@ -113,6 +259,9 @@ async def store_batch_metadata(batch_id: str, file_id: str, chunk_ids: List[Tupl
             metadata,
             upsert=True
         )
+    
+    # Flag the chunks so get_chunks_without_batches skips them
+    await mark_chunks_embedded(batch_id, chunk_ids)
 
 
 async def get_incomplete_batch_ids() -> List[str]:
@@ -147,46 +296,61 @@ async def get_incomplete_batch_ids() -> List[str]:
     return batch_ids
 
 
-async def store_file_metadata(file_id: str, chunk_ids: List[Tuple[int, int]], status: str = "uploaded") -> None:
+async def store_file_metadata(
+    files: List[Tuple[str, List[Tuple[int, int]]]],
+    status: str = "uploaded",
+) -> None:
     """
-    Store file metadata in MongoDB.
+    Store metadata for several uploaded files in MongoDB with one bulk write.
+    
+    Each file is upserted on file_id. The status and timestamps are only set when
+    the document is inserted, so a status the file polling stage already wrote
+    (see update_file_metadata_status) is not rolled back by a later flush.
     
     Args:
-        file_id: OpenAI file ID
-        chunk_ids: List of (qid, chunk_id) tuples in this file
-        status: Current file status ("uploaded", "processing", "processed", "failed")
+        files: List of (file_id, chunk_ids) pairs, chunk_ids being (qid, chunk_id) tuples
+        status: Initial file status ("uploaded", "processing", "processed", "failed")
     """
-    metadata = {
-        "file_id": file_id,
-        "chunk_ids": chunk_ids,
-        "status": status,
-        "created_at": datetime.utcnow(),
-        "updated_at": datetime.utcnow(),
-    }
+    if not files:
+        return
     
-    await embeddings_file_metadata_collection.replace_one(
-        {"file_id": file_id},
-        metadata,
-        upsert=True
-    )
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne(
+            {"file_id": file_id},
+            {
+                "$set": {"chunk_ids": chunk_ids},
+                "$setOnInsert": {"status": status, "created_at": now, "updated_at": now},
+            },
+            upsert=True,
+        )
+        for file_id, chunk_ids in files
+    ]
+    await embeddings_file_metadata_collection.bulk_write(operations, ordered=False)
 
 
 async def update_file_metadata_status(file_id: str, status: str) -> None:
     """
     Update file metadata status in MongoDB.
     
+    Upserts, because FileUploadStage buffers its metadata writes and the status
+    update can reach MongoDB before the file's document does.
+    
     Args:
         file_id: OpenAI file ID
         status: New status ("uploaded", "processing", "processed", "failed")
     """
+    now = datetime.now(timezone.utc)
     await embeddings_file_metadata_collection.update_one(
         {"file_id": file_id},
         {
             "$set": {
                 "status": status,
-                "updated_at": datetime.utcnow(),
-            }
-        }
+                "updated_at": now,
+            },
+            "$setOnInsert": {"created_at": now},
+        },
+        upsert=True,
     )
 
 
@@ -206,7 +370,7 @@ async def update_batch_metadata_status(batch_id: str, status: str) -> None:
     
     # Add completed_at timestamp for terminal states
     if status in ["completed", "failed", "expired", "cancelled"]:
-        update_data["$set"]["completed_at"] = datetime.utcnow()
+        update_data["$set"]["completed_at"] = datetime.now(timezone.utc)
     
     await embeddings_batch_metadata_collection.update_one(
         {"batch_id": batch_id},
@@ -214,42 +378,67 @@ async def update_batch_metadata_status(batch_id: str, status: str) -> None:
     )
 
 
-async def upload_embeddings_to_mongo(embeddings: Dict[Tuple[int, int], List[float]]) -> None:
+async def upload_embeddings_to_mongo(keys: List[Tuple[int, int]], vectors: np.ndarray) -> None:
     """
     Upload embeddings to MongoDB embeddings collection.
     
+    Embeddings are almost always new, so they are written with a plain unordered
+    insert_many (no per-document lookup). Documents that hit the (qid, chunk_id)
+    unique index (re-runs) then get their embedding updated in place, which keeps
+    any metadata fields already added to them.
+    
     Args:
-        embeddings: Dictionary mapping (qid, chunk_id) to embedding vector
+        keys: (qid, chunk_id) tuples, one per row of `vectors`
+        vectors: (len(keys), dimensions) float32 array of embedding vectors
     """
-    if not embeddings:
+    if not keys:
         logger.warning("No embeddings to upload")
         return
     
     # Get embeddings collection
     embeddings_collection = db["embeddings"]
     
-    # Build ReplaceOne operations for bulk write
-    operations = []
-    for (qid, chunk_id), embedding in embeddings.items():
-        operations.append(
-            ReplaceOne(
-                {"qid": qid, "chunk_id": chunk_id},
-                {
-                    "qid": qid,
-                    "chunk_id": chunk_id,
-                    "embedding": embedding
-                },
+    # Vectors are stored as packed float32 BSON binary vectors (subtype 9):
+    # 4 bytes per dimension instead of a BSON array of doubles, and still
+    # indexable by Atlas Vector Search. Each row's little-endian bytes go in
+    # directly behind the vector header, without a round trip through lists.
+    vectors = np.ascontiguousarray(vectors, dtype="<f4")
+    docs = [
+        {
+            "qid": qid,
+            "chunk_id": chunk_id,
+            "embedding": Binary(_FLOAT32_VECTOR_HEADER + row.tobytes(), VECTOR_SUBTYPE)
+        }
+        for (qid, chunk_id), row in zip(keys, vectors)
+    ]
+    
+    try:
+        await embeddings_collection.insert_many(docs, ordered=False)
+        inserted_count = len(docs)
+        updated_count = 0
+    except BulkWriteError as e:
+        write_errors = e.details.get("writeErrors", [])
+        duplicate_errors = [err for err in write_errors if err.get("code") == 11000]
+        if len(duplicate_errors) != len(write_errors):
+            raise
+        
+        # Overwrite the embedding of documents that already exist
+        operations = [
+            UpdateOne(
+                {"qid": docs[err["index"]]["qid"], "chunk_id": docs[err["index"]]["chunk_id"]},
+                {"$set": {"embedding": docs[err["index"]]["embedding"]}},
                 upsert=True
             )
-        )
+            for err in duplicate_errors
+        ]
+        update_result = await embeddings_collection.bulk_write(operations, ordered=False)
+        inserted_count = e.details.get("nInserted", 0)
+        updated_count = update_result.upserted_count + update_result.modified_count
     
-    # Execute bulk write
-    if operations:
-        result = await embeddings_collection.bulk_write(operations, ordered=False)
-        logger.info(
-            f"Uploaded {result.upserted_count + result.modified_count} embeddings "
-            f"({len(operations)} total)"
-        )
+    logger.info(
+        f"Uploaded {inserted_count + updated_count} embeddings "
+        f"({inserted_count} inserted, {updated_count} updated, {len(docs)} total)"
+    )
 
 
 async def mark_batch_as_processed(batch_id: str) -> None:
@@ -264,7 +453,7 @@ async def mark_batch_as_processed(batch_id: str) -> None:
         {
             "$set": {
                 "processed": True,
-                "processed_at": datetime.utcnow(),
+                "processed_at": datetime.now(timezone.utc),
             }
         }
     )
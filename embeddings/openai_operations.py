@@ -9,38 +9,78 @@ This module handles:
 - Downloading batch results
 """
 
-import json
-from io import BytesIO
-from typing import Tuple, Optional, Dict, List
+import re
+from collections import Counter
+import numpy as np
+import orjson
+from openai import APIConnectionError, InternalServerError, RateLimitError
+from typing import AsyncIterator, Tuple, Optional, List
 
 from embeddings.config import (
     logger,
     async_embeddings_client,
+    EMBEDDING_DIMENSIONS,
     embeddings_batch_metadata_collection,
 )
-from datetime import datetime
+from datetime import datetime, timezone
 
+# custom_id format written by data_formatting: "qid-{qid}-chunk-{chunk_id}"
+_CUSTOM_ID_RE = re.compile(r"qid-(\d+)-chunk-(\d+)")
 
-async def submit_input_file(jsonl_content: str) -> str:
+# Fast path over a raw batch output line: the custom_id and the embedding array,
+# which the output schema always writes in that order
+_RESULT_LINE_RE = re.compile(
+    rb'"custom_id":\s*"qid-(\d+)-chunk-(\d+)".*?"embedding":\s*(\[[^\]]*\])',
+    re.DOTALL,
+)
+
+# Transient API errors (after the SDK's own retries) that pollers should wait
+# out rather than treat as a terminal "error" status
+RETRYABLE_API_ERRORS = (APIConnectionError, InternalServerError, RateLimitError)
+
+
+def retry_after_seconds(exc: Exception) -> Optional[float]:
     """
-    Upload JSONL content to OpenAI as a file.
+    Read the server's requested delay (Retry-After / retry-after-ms) from an API error.
     
     Args:
-        jsonl_content: JSONL content as string
+        exc: Exception raised by the OpenAI SDK
     
     Returns:
-        file_id: OpenAI file ID
+        Delay in seconds, or None if the response did not ask for one
     """
-    # Convert string to bytes
-    jsonl_bytes = jsonl_content.encode('utf-8')
+    response = getattr(exc, "response", None)
+    if response is None:
+        return None
     
-    # Create a file-like object with name attribute (required by OpenAI SDK)
-    file_obj = BytesIO(jsonl_bytes)
-    file_obj.name = "batch.jsonl"
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        # HTTP-date form of Retry-After; fall back to the normal backoff
+        return None
+    return None
+
+
+async def submit_input_file(jsonl_content: bytes) -> str:
+    """
+    Upload JSONL content to OpenAI as a file.
+    
+    The bytes are handed to the SDK as a (filename, content) pair, so the multipart
+    body is sent straight from the batch buffer without wrapping or re-reading it.
     
-    # Upload file - OpenAI SDK expects a file-like object
+    Args:
+        jsonl_content: JSONL content as UTF-8 bytes
+    
+    Returns:
+        file_id: OpenAI file ID
+    """
+    # The filename tells OpenAI the content is JSONL
     file_response = await async_embeddings_client.files.create(
-        file=file_obj,
+        file=("batch.jsonl", jsonl_content),
         purpose="batch"
     )
     
@@ -78,12 +118,17 @@ async def poll_file_status(file_id: str) -> Tuple[str, bool]:
     
     Returns:
         Tuple of (status, is_ready) where is_ready=True when status="processed"
+    
+    Raises:
+        One of RETRYABLE_API_ERRORS for transient failures (rate limits, 5xx, network)
     """
     try:
         file = await async_embeddings_client.files.retrieve(file_id)
         status = file.status
         is_ready = (status == "processed")
         return status, is_ready
+    except RETRYABLE_API_ERRORS:
+        raise
     except Exception as e:
         logger.error(f"Error polling file {file_id}: {e}")
         return "error", False
@@ -98,11 +143,14 @@ async def poll_batch_status(batch_id: str) -> Tuple[str, Optional[str]]:
     
     Returns:
         Tuple of (status, output_file_id if completed)
+    
+    Raises:
+        One of RETRYABLE_API_ERRORS for transient failures (rate limits, 5xx, network)
     """
     try:
         batch = await async_embeddings_client.batches.retrieve(batch_id)
         status = batch.status
-        output_file_id = batch.output_file_id if hasattr(batch, 'output_file_id') and batch.output_file_id else None
+        output_file_id = getattr(batch, 'output_file_id', None) or None
         
         # Update MongoDB
         await embeddings_batch_metadata_collection.update_one(
@@ -111,86 +159,171 @@ async def poll_batch_status(batch_id: str) -> Tuple[str, Optional[str]]:
                 "$set": {
                     "status": status,
                     "result_file_id": output_file_id,
-                    "completed_at": datetime.utcnow() if status in ["completed", "failed", "expired"] else None
+                    "completed_at": datetime.now(timezone.utc) if status in ["completed", "failed", "expired", "cancelled"] else None
                 }
             }
         )
         
         return status, output_file_id
+    except RETRYABLE_API_ERRORS:
+        raise
     except Exception as e:
         logger.error(f"Error polling batch {batch_id}: {e}")
         return "error", None
 
 
-async def download_batch_results(batch_id: str, output_file_id: str) -> Dict[Tuple[int, int], List[float]]:
+def _parse_batch_output(
+    batch_id: str,
+    content: bytes,
+    skipped: Counter,
+) -> Tuple[List[Tuple[int, int]], np.ndarray]:
+    """
+    Parse batch output JSONL into (qid, chunk_id) keys and a float32 vector matrix.
+    
+    Skipped lines are only counted per reason in `skipped` (the caller logs one
+    summary); per-line details go to the debug log with lazy %-formatting.
+    
+    Args:
+        batch_id: OpenAI batch ID (for logging)
+        content: Raw output file content (UTF-8 JSONL bytes)
+        skipped: Counter of skipped lines by reason, updated in place
+    
+    Returns:
+        Tuple of (keys, vectors): keys[i] is the (qid, chunk_id) of row i of the
+        (len(keys), EMBEDDING_DIMENSIONS) float32 array
+    """
+    lines = content.split(b"\n")
+    keys = []
+    # One row per line at most; each embedding is copied into its row as soon as
+    # it is parsed, so its list of Python floats can be freed right away
+    vectors = np.empty((len(lines), EMBEDDING_DIMENSIONS), dtype=np.float32)
+    for line in lines:
+        if not line.strip():
+            continue
+        
+        # Only the embedding array is decoded; the rest of the result JSON (ids,
+        # status, usage) is skipped at the bytes level. Anything unexpected falls
+        # through to the full parse below.
+        fast = _RESULT_LINE_RE.search(line)
+        if fast is not None:
+            try:
+                embedding = orjson.loads(fast[3])
+            except orjson.JSONDecodeError:
+                embedding = None
+            if embedding is not None and len(embedding) == EMBEDDING_DIMENSIONS:
+                vectors[len(keys)] = embedding
+                keys.append((int(fast[1]), int(fast[2])))
+                continue
+        
+        try:
+            result_data = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            skipped["invalid JSON"] += 1
+            logger.debug("Error parsing JSON line in batch %s: %s", batch_id, e)
+            continue
+        
+        # Parse custom_id format: "qid-{qid}-chunk-{chunk_id}"
+        custom_id = result_data.get('custom_id') or ''
+        match = _CUSTOM_ID_RE.fullmatch(custom_id)
+        if match is None:
+            skipped["invalid custom_id"] += 1
+            logger.debug("Skipping line with invalid custom_id: %s", custom_id)
+            continue
+        
+        # Extract embedding from response body
+        response = result_data.get('response') or {}
+        body = response.get('body') or {}
+        data = body.get('data') or []
+        
+        if not data:
+            skipped["no embedding data"] += 1
+            logger.debug("No embedding data found for %s", custom_id)
+            continue
+        
+        # Get embedding vector (first item in data array)
+        embedding = data[0].get('embedding', [])
+        if len(embedding) != EMBEDDING_DIMENSIONS:
+            skipped["unexpected embedding length"] += 1
+            logger.debug(
+                "Unexpected embedding length %d for %s (expected %d)",
+                len(embedding), custom_id, EMBEDDING_DIMENSIONS,
+            )
+            continue
+        
+        vectors[len(keys)] = embedding
+        keys.append((int(match[1]), int(match[2])))
+    
+    return keys, vectors[:len(keys)]
+
+
+async def stream_batch_results(
+    batch_id: str,
+    output_file_id: str,
+    batch_size: int = 1000,
+) -> AsyncIterator[Tuple[List[Tuple[int, int]], np.ndarray]]:
     """
-    Download batch results from OpenAI and parse embeddings.
+    Stream batch results from OpenAI and parse embeddings as they arrive.
     
     IMPORTANT: This function downloads content IN MEMORY ONLY - no files are written to disk.
     All content is processed in memory and never saved locally.
     
+    The response body is read in 64KB pieces into a bytearray; each complete line
+    is sliced out and parsed with orjson (no decode to str first), so only the
+    current partial line and the pending vectors are held in memory. Vectors are
+    kept as float32 arrays rather than lists of Python floats.
+    
     Args:
         batch_id: OpenAI batch ID
         output_file_id: OpenAI output file ID
+        batch_size: Number of embeddings to yield at a time
     
-    Returns:
-        Dict mapping (qid, chunk_id) to embedding vector
+    Yields:
+        Tuples of (keys, vectors): (qid, chunk_id) keys and the matching
+        (len(keys), EMBEDDING_DIMENSIONS) float32 array
     """
-    try:
-        # Download file content IN MEMORY ONLY - no disk writes
-        file_response = await async_embeddings_client.files.content(output_file_id)
-        content = file_response.text
-
-        # Parse JSONL (in memory)
-        embeddings = {}
-        for line in content.strip().split('\n'):
-            if not line:
-                continue
-            try:
-                result_data = json.loads(line)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Error parsing JSON line: {e}")
-                continue
-            
-            # Extract custom_id and parse qid, chunk_id
-            custom_id = result_data.get('custom_id', '')
-            if not custom_id.startswith('qid-') or '-chunk-' not in custom_id:
-                logger.debug(f"Skipping line with invalid custom_id: {custom_id}")
-                continue
-            
-            # Parse custom_id format: "qid-{qid}-chunk-{chunk_id}"
-            try:
-                parts = custom_id.replace('qid-', '').split('-chunk-')
-                if len(parts) != 2:
-                    logger.debug(f"Invalid custom_id format: {custom_id}")
-                    continue
-                qid = int(parts[0])
-                chunk_id = int(parts[1])
-            except (ValueError, IndexError) as e:
-                logger.debug(f"Error parsing custom_id {custom_id}: {e}")
-                continue
-            
-            # Extract embedding from response body
-            response = result_data.get('response', {})
-            body = response.get('body', {})
-            data = body.get('data', [])
-            
-            if not data or len(data) == 0:
-                logger.warning(f"No embedding data found for {custom_id}")
+    buffer = bytearray()
+    pending_keys: List[Tuple[int, int]] = []
+    pending_vectors: List[np.ndarray] = []
+    total = 0
+    skipped: Counter = Counter()
+    
+    def add_lines(content: bytes) -> None:
+        keys, vectors = _parse_batch_output(batch_id, content, skipped)
+        if keys:
+            pending_keys.extend(keys)
+            pending_vectors.append(vectors)
+    
+    def take_pending() -> Tuple[List[Tuple[int, int]], np.ndarray]:
+        keys, vectors = pending_keys[:], np.concatenate(pending_vectors)
+        pending_keys.clear()
+        pending_vectors.clear()
+        return keys, vectors
+    
+    async with async_embeddings_client.files.with_streaming_response.content(output_file_id) as response:
+        async for data in response.iter_bytes(chunk_size=65536):
+            buffer.extend(data)
+            end = buffer.rfind(b"\n")
+            if end == -1:
                 continue
             
-            # Get embedding vector (first item in data array)
-            embedding = data[0].get('embedding', [])
-            if not embedding:
-                logger.warning(f"Empty embedding for {custom_id}")
-                continue
+            # Parse every complete line and keep the trailing partial line
+            add_lines(bytes(buffer[:end]))
+            del buffer[:end + 1]
             
-            embeddings[(qid, chunk_id)] = embedding
-        
-        logger.info(f"Downloaded {len(embeddings)} embeddings from batch {batch_id}")
-        return embeddings
-    except Exception as e:
-        logger.error(f"Error downloading results for batch {batch_id}: {e}")
-        import traceback
-        logger.error(traceback.format_exc())
-        return {}
+            if len(pending_keys) >= batch_size:
+                total += len(pending_keys)
+                yield take_pending()
+    
+    # Last line may not end with a newline
+    if buffer:
+        add_lines(bytes(buffer))
+    if pending_keys:
+        total += len(pending_keys)
+        yield take_pending()
+    
+    if skipped:
+        logger.warning(
+            f"Skipped {sum(skipped.values())} result lines in batch {batch_id}: "
+            + ", ".join(f"{count} {reason}" for reason, count in skipped.most_common())
+        )
+    logger.info(f"Downloaded {total} embeddings from batch {batch_id}")
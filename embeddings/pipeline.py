@@ -7,7 +7,7 @@ and shutting down the entire pipeline.
 
 from __future__ import annotations
 
-from typing import Any, List, Optional
+from typing import Any, Iterable, List, Optional, Set, Tuple
 
 from embeddings.config import logger
 from embeddings.stages.base_stage import PipelineStage
@@ -29,6 +29,8 @@ class EmbeddingPipeline:
         self.stages: List[PipelineStage] = []
         self._started: bool = False
         self._shutdown_reason: Optional[str] = None
+        # (qid, chunk_id) pairs enqueued but not yet recorded in a batch in MongoDB
+        self._inflight: Set[Tuple[int, int]] = set()
 
     def add_stage(self, stage: PipelineStage) -> None:
         """Add a stage to the pipeline.
@@ -82,6 +84,27 @@ class EmbeddingPipeline:
 
         await self.stages[0].enqueue(item)
 
+    def mark_inflight(self, chunk_ids: Iterable[Tuple[int, int]]) -> None:
+        """Record chunks as held by the pipeline (call when enqueuing their batch).
+
+        Args:
+            chunk_ids: (qid, chunk_id) tuples in the enqueued batch
+        """
+        self._inflight.update(chunk_ids)
+
+    def release_inflight(self, chunk_ids: Iterable[Tuple[int, int]]) -> None:
+        """Forget chunks once their batch is stored (they are flagged in MongoDB).
+
+        Args:
+            chunk_ids: (qid, chunk_id) tuples in the stored batch
+        """
+        self._inflight.difference_update(chunk_ids)
+
+    @property
+    def inflight_chunk_ids(self) -> Set[Tuple[int, int]]:
+        """(qid, chunk_id) pairs that are enqueued but not yet in a stored batch."""
+        return self._inflight
+
     def get_stage_by_name(self, name: str) -> Optional[PipelineStage]:
         """Get a stage by its name.
 
@@ -120,6 +143,7 @@ class EmbeddingPipeline:
         return {
             "started": self._started,
             "num_stages": len(self.stages),
+            "inflight_chunks": len(self._inflight),
             "stages": [stage.get_status() for stage in self.stages],
         }
 
@@ -146,8 +170,9 @@ class EmbeddingPipeline:
             shutdown_msg += f" (reason: {self._shutdown_reason})"
         logger.info(shutdown_msg)
         
-        # Stop stages in reverse order (last stage first)
-        for stage in reversed(self.stages):
+        # Stop stages in order (first stage first), so items a stage finishes while
+        # stopping can still be forwarded to the stages after it
+        for stage in self.stages:
             await stage.stop_workers()
         self._started = False
         logger.info("[Pipeline] Pipeline shutdown complete")
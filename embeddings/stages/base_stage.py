@@ -5,6 +5,8 @@ Each stage:
 - Runs a background worker loop pulling items from the queue
 - Applies a stage-specific `process_item` implementation
 - Optionally forwards results to the next stage
+- Shuts down by queueing a sentinel per worker, so in-progress items finish
+- Drops items enqueued after shutdown, so join() on a stopped stage cannot hang
 
 Concrete stages should subclass `PipelineStage` and implement `process_item`.
 """
@@ -12,12 +14,23 @@ Concrete stages should subclass `PipelineStage` and implement `process_item`.
 from __future__ import annotations
 
 import asyncio
+import random
 from abc import ABC, abstractmethod
-from typing import Any, Optional, TYPE_CHECKING
+from typing import Any, Optional, Set, TYPE_CHECKING
+
+from embeddings.config import logger
 
 if TYPE_CHECKING:
     from embeddings.pipeline import EmbeddingPipeline
 
+# Queued once per worker by stop_workers; a worker exits when it takes one
+_SHUTDOWN = object()
+
+
+def jittered(interval: float) -> float:
+    """Spread `interval` by +/-20% so concurrent pollers don't fire in lockstep."""
+    return interval * (0.8 + 0.4 * random.random())
+
 
 class PipelineStage(ABC):
     """Abstract base class for a single stage in the pipeline.
@@ -29,14 +42,21 @@ class PipelineStage(ABC):
     - Optionally forward processed results to the next stage
     """
 
+    STOP_TIMEOUT: float = 30  # Seconds stop_workers waits for in-progress items
+
     def __init__(
         self,
         name: str,
         max_concurrent: int,
         next_stage: Optional["PipelineStage"] = None,
+        queue_maxsize: Optional[int] = None,
     ) -> None:
         self.name = name
-        self.input_queue: "asyncio.Queue[Any]" = asyncio.Queue()
+        # A bounded queue makes enqueue() wait when this stage falls behind,
+        # throttling upstream producers; defaults to max_concurrent * 4 items
+        if queue_maxsize is None:
+            queue_maxsize = max_concurrent * 4
+        self.input_queue: "asyncio.Queue[Any]" = asyncio.Queue(maxsize=queue_maxsize)
         self.max_concurrent = max_concurrent
         self.next_stage = next_stage
 
@@ -59,24 +79,36 @@ class PipelineStage(ABC):
         """Background loop that pulls items from the queue and processes them.
 
         Multiple instances of this coroutine may run in parallel (one per worker),
-        all sharing the same input queue.
+        all sharing the same input queue. Each worker exits when it takes a
+        shutdown sentinel off the queue, so an item is never interrupted halfway.
         """
         try:
-            while self._running:
+            while True:
                 item = await self.input_queue.get()
+                if item is _SHUTDOWN:
+                    self.input_queue.task_done()
+                    return
                 try:
                     result = await self.process_item(item)
                     self._processed_count += 1
-
-                    # Forward to next stage if there is one and we have a result
-                    if self.next_stage is not None and result is not None:
-                        await self.next_stage.enqueue(result)
+                    await self._forward(result)
                 finally:
                     self.input_queue.task_done()
         except asyncio.CancelledError:
-            # Graceful shutdown: allow the task to be cancelled cleanly
+            # Workers that overran STOP_TIMEOUT are cancelled
             pass
 
+    async def _forward(self, result: Any) -> None:
+        """Enqueue a result into the next stage, unless there is none or it has stopped."""
+        if self.next_stage is None or result is None:
+            return
+        if not self.next_stage._running:
+            logger.warning(
+                f"{self.name}: {self.next_stage.name} has stopped; dropping result"
+            )
+            return
+        await self.next_stage.enqueue(result)
+
     async def start_workers(self) -> None:
         """Start background worker tasks if not already running.
 
@@ -91,19 +123,74 @@ class PipelineStage(ABC):
             for i in range(self.max_concurrent)
         ]
 
+    def _drain_queue(self, keep_sentinels: bool = True) -> int:
+        """Drop the items still waiting in the input queue (so join() cannot hang).
+
+        Args:
+            keep_sentinels: Put shutdown sentinels back for workers yet to take them
+
+        Returns:
+            Number of items dropped, not counting sentinels
+        """
+        dropped = 0
+        sentinels = 0
+        while not self.input_queue.empty():
+            item = self.input_queue.get_nowait()
+            self.input_queue.task_done()
+            if item is _SHUTDOWN:
+                sentinels += 1
+            else:
+                dropped += 1
+        # Anything just taken off has made room for the sentinels
+        if keep_sentinels:
+            for _ in range(sentinels):
+                self.input_queue.put_nowait(_SHUTDOWN)
+        return dropped
+
     async def stop_workers(self) -> None:
-        """Signal all workers to stop and wait for them to finish."""
+        """Stop all workers, letting items already being processed finish.
+
+        Queued items are dropped and one shutdown sentinel per worker is queued in
+        their place. Workers still busy after STOP_TIMEOUT seconds are cancelled.
+        Producers that were waiting on the full queue can still slip items in
+        behind the sentinels; those are dropped once the workers have exited.
+        Safe to call from inside one of this stage's own workers (e.g. when a
+        failure triggers pipeline shutdown); that worker exits once it returns.
+        """
         self._running = False
-        for task in self._worker_tasks:
-            if not task.done():
-                task.cancel()
-        for task in self._worker_tasks:
-            try:
-                await task
-            except asyncio.CancelledError:
-                pass
+        workers = [task for task in self._worker_tasks if not task.done()]
         self._worker_tasks.clear()
 
+        dropped = self._drain_queue()
+        if dropped:
+            logger.warning(f"{self.name}: Dropped {dropped} queued items on shutdown")
+        # The queue was just emptied, so there is room for every sentinel
+        for _ in workers:
+            self.input_queue.put_nowait(_SHUTDOWN)
+
+        current = asyncio.current_task()
+        others = [task for task in workers if task is not current]
+        if others:
+            _, pending = await asyncio.wait(others, timeout=self.STOP_TIMEOUT)
+            if pending:
+                logger.warning(
+                    f"{self.name}: {len(pending)} workers still busy after {self.STOP_TIMEOUT}s; cancelling"
+                )
+                for task in pending:
+                    task.cancel()
+                await asyncio.gather(*pending, return_exceptions=True)
+        else:
+            # Let producers woken by the drain above finish their put()
+            await asyncio.sleep(0)
+
+        # Cancelled workers leave their sentinels behind; only the calling
+        # worker (if this runs inside one) still needs its sentinel
+        dropped = self._drain_queue(keep_sentinels=False)
+        if current in workers:
+            self.input_queue.put_nowait(_SHUTDOWN)
+        if dropped:
+            logger.warning(f"{self.name}: Dropped {dropped} items enqueued during shutdown")
+
     def set_pipeline(self, pipeline: "EmbeddingPipeline") -> None:
         """Set the pipeline reference so this stage can trigger shutdown on failure.
         
@@ -113,16 +200,92 @@ class PipelineStage(ABC):
         self.pipeline = pipeline
 
     async def enqueue(self, item: Any) -> None:
-        """Add a new item to this stage's input queue."""
+        """Add a new item to this stage's input queue, waiting while it is full.
+
+        Items arriving after stop_workers are dropped, since no worker would ever
+        take them off the queue.
+        """
+        if not self._running:
+            logger.warning(f"{self.name}: Stage has stopped; dropping enqueued item")
+            return
         await self.input_queue.put(item)
+        if not self._running:
+            # Woken by stop_workers' drain, so the item landed behind the sentinels
+            self._drain_queue()
 
     def get_status(self) -> dict:
         """Return a lightweight snapshot of this stage's status."""
         return {
             "name": self.name,
             "queue_size": self.input_queue.qsize(),
+            "queue_maxsize": self.input_queue.maxsize,
             "num_workers": len(self._worker_tasks),
             "max_concurrent": self.max_concurrent,
             "processed_count": self._processed_count,
             "running": self._running,
         }
+
+
+class DispatchingStage(PipelineStage):
+    """Pipeline stage that handles every queued item in its own task.
+
+    For stages whose items spend most of their time waiting on OpenAI (minutes to
+    hours), so a fixed pool of workers would cap how many can be in flight. A
+    single dispatcher takes items off the queue and starts one lightweight task
+    per item; subclasses bound the actual API/DB calls themselves.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self._item_tasks: Set[asyncio.Task] = set()
+
+    async def _handle_item(self, item: Any) -> None:
+        """Task for one item; it only counts as done on the queue once handled."""
+        try:
+            result = await self.process_item(item)
+            self._processed_count += 1
+            await self._forward(result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:  # noqa: BLE001
+            logger.error(f"{self.name}: Error handling {item!r}: {e}", exc_info=True)
+        finally:
+            self.input_queue.task_done()
+
+    async def _worker_loop(self) -> None:
+        """Dispatcher that starts a task for every item taken off the queue."""
+        while True:
+            item = await self.input_queue.get()
+            if item is _SHUTDOWN:
+                self.input_queue.task_done()
+                return
+            task = asyncio.create_task(self._handle_item(item))
+            self._item_tasks.add(task)
+            task.add_done_callback(self._item_tasks.discard)
+
+    async def start_workers(self) -> None:
+        """Start the dispatcher if it is not already running."""
+        if any(not t.done() for t in self._worker_tasks):
+            return
+
+        self._running = True
+        self._worker_tasks = [
+            asyncio.create_task(self._worker_loop(), name=f"{self.name}-dispatcher")
+        ]
+
+    async def stop_workers(self) -> None:
+        """Stop the dispatcher and cancel the item tasks still running."""
+        await super().stop_workers()
+
+        # Shutdown may be triggered from inside an item task (e.g. on a failed batch)
+        current = asyncio.current_task()
+        item_tasks = [task for task in self._item_tasks if task is not current]
+        for task in item_tasks:
+            task.cancel()
+        await asyncio.gather(*item_tasks, return_exceptions=True)
+
+    def get_status(self) -> dict:
+        """Return a lightweight snapshot of this stage's status."""
+        status = super().get_status()
+        status["in_flight"] = len(self._item_tasks)
+        return status
@@ -61,6 +61,9 @@ class BatchCreationStage(PipelineStage):
                 status="validating",
                 retry_of=None,
             )
+            # The chunks are now flagged in MongoDB, so the fetch query skips them
+            if self.pipeline is not None:
+                self.pipeline.release_inflight(chunk_ids)
             # Forward batch_id to next stage
             return batch_id
         except Exception as e:  # noqa: BLE001
@@ -0,0 +1,96 @@
+"""Batch lifecycle stage for the embeddings pipeline.
+
+This stage fuses batch creation, batch polling and embedding upload into one
+coroutine per batch, so a batch no longer crosses two extra stage queues on its
+way from a ready file to MongoDB.
+
+This stage:
+- Receives (file_id, chunk_ids) items from FilePollingStage, or a batch_id str to
+  resume a batch from a previous run (it skips creation)
+- Creates the batch and stores its metadata (BatchCreationStage logic)
+- Waits for the batch to reach a terminal state (BatchPollingStage logic, including
+  shutdown on failure)
+- Downloads and uploads the embeddings, then marks the batch processed
+  (EmbeddingUploadStage logic)
+
+The three steps keep their own stage classes; each step's `max_concurrent` bounds
+how many batches run that step at once, while any number of batches can be waiting
+on OpenAI in between. All progress is recorded in MongoDB, so a batch interrupted
+by shutdown is picked up again by the resume path.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Optional, TYPE_CHECKING
+
+from embeddings.stages.base_stage import DispatchingStage, PipelineStage
+from embeddings.stages.batch_creation_stage import BatchCreationStage
+from embeddings.stages.batch_polling_stage import BatchPollingStage
+from embeddings.stages.embedding_upload_stage import EmbeddingUploadStage
+
+if TYPE_CHECKING:
+    from embeddings.pipeline import EmbeddingPipeline
+
+
+class BatchLifecycleStage(DispatchingStage):
+    """Pipeline stage that takes each batch from creation to uploaded embeddings.
+
+    Input items are expected to be either:
+        (file_id, chunk_ids)  # From FilePollingStage: create a new batch
+        batch_id: str         # Incomplete batch from a previous run: resume polling
+
+    This is the final stage, so it does not forward items to any next stage.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        creation: BatchCreationStage,
+        polling: BatchPollingStage,
+        upload: EmbeddingUploadStage,
+        next_stage: Optional[PipelineStage] = None,
+        queue_maxsize: Optional[int] = None,
+    ) -> None:
+        super().__init__(
+            name=name,
+            max_concurrent=creation.max_concurrent,
+            next_stage=next_stage,
+            queue_maxsize=queue_maxsize,
+        )
+        self.creation = creation
+        self.polling = polling
+        self.upload = upload
+        self._creation_slots = asyncio.Semaphore(creation.max_concurrent)
+        self._upload_slots = asyncio.Semaphore(upload.max_concurrent)
+
+    def set_pipeline(self, pipeline: "EmbeddingPipeline") -> None:
+        """Set the pipeline reference on this stage and on each step."""
+        super().set_pipeline(pipeline)
+        for step in (self.creation, self.polling, self.upload):
+            step.set_pipeline(pipeline)
+
+    async def process_item(self, item: Any) -> None:
+        """Run one batch through creation (unless resuming), polling and upload."""
+        if isinstance(item, str):
+            batch_id = item
+        else:
+            async with self._creation_slots:
+                batch_id = await self.creation.process_item(item)
+            if batch_id is None:
+                return None
+
+        # Only forwards (batch_id, output_file_id) once the batch has completed
+        completed = await self.polling.process_item(batch_id)
+        if completed is None:
+            return None
+
+        async with self._upload_slots:
+            await self.upload.process_item(completed)
+        return None
+
+    async def stop_workers(self) -> None:
+        """Stop the dispatcher, cancel in-flight batches and stop each step."""
+        await super().stop_workers()
+        for step in (self.creation, self.polling, self.upload):
+            await step.stop_workers()
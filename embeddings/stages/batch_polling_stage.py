@@ -2,23 +2,29 @@
 
 This stage:
 - Receives batch_id items from BatchCreationStage
-- Polls batch status every EMBEDDING_POLL_INTERVAL seconds until terminal state
+- Waits on its completion source until each batch reaches a terminal state (by
+  default polled from one loop, starting at EMBEDDING_POLL_INTERVAL seconds and
+  backing off with jitter up to EMBEDDING_MAX_POLL_INTERVAL per batch while its
+  status is unchanged)
 - If "failed": Updates MongoDB and triggers pipeline shutdown
 - If "completed": Updates MongoDB and forwards (batch_id, output_file_id) to next stage
 """
 
 from __future__ import annotations
 
-import asyncio
-from typing import Any
+from typing import Any, Optional, Tuple
 
-from embeddings.config import logger, EMBEDDING_POLL_INTERVAL
+from embeddings.completion_sources import Outcome
+from embeddings.config import (
+    logger,
+    EMBEDDING_POLL_INTERVAL,
+    EMBEDDING_MAX_POLL_INTERVAL,
+)
 from embeddings.openai_operations import poll_batch_status
-from embeddings.mongo_operations import update_batch_metadata_status
-from embeddings.stages.base_stage import PipelineStage
+from embeddings.stages.polling_stage import PollingStage
 
 
-class BatchPollingStage(PipelineStage):
+class BatchPollingStage(PollingStage):
     """Pipeline stage that polls batch status until completion or failure.
 
     Input items are expected to be:
@@ -28,72 +34,69 @@ class BatchPollingStage(PipelineStage):
         (batch_id, output_file_id)  # Only forwarded if batch status is "completed"
     """
 
-    async def process_item(self, item: Any) -> Any:
-        """Poll batch status until it reaches a terminal state (completed or failed)."""
-        # Validate item structure
+    POLL_INTERVAL = int(EMBEDDING_POLL_INTERVAL)
+    MAX_POLL_INTERVAL = int(EMBEDDING_MAX_POLL_INTERVAL)
+    TERMINAL_STATES = {"completed", "failed", "expired", "cancelled", "error"}
+
+    def item_key(self, item: Any) -> Optional[str]:
+        """Validate a batch_id item and return it."""
         if not isinstance(item, str):
             logger.error(
                 f"{self.name}: Invalid item type for batch polling: expected str, got {type(item)}"
             )
             return None
+        return item
 
-        batch_id = item
-        terminal_states = {"completed", "failed", "expired", "cancelled", "error"}
-        poll_interval = int(EMBEDDING_POLL_INTERVAL)
-
-        logger.info(f"{self.name}: Starting to poll batch {batch_id}")
+    async def check_status(self, batch_id: str) -> Tuple[bool, str, Any]:
+        """Poll batch status once; done when it reaches a terminal state.
 
-        # Poll batch status until it reaches a terminal state
-        while True:
-            status, output_file_id = await poll_batch_status(batch_id)
+        While the batch is still processing, the polling source backs off while the
+        status is unchanged and starts over when it moves on (validating -> in_progress -> ...)
+        """
+        # poll_batch_status also persists status, result_file_id and completed_at
+        status, output_file_id = await poll_batch_status(batch_id)
 
-            # Update MongoDB with current status (poll_batch_status already updates, but
-            # we'll also call update_batch_metadata_status for consistency)
-            await update_batch_metadata_status(batch_id, status)
+        return status in self.TERMINAL_STATES, status, output_file_id
 
-            # Check for failure state
-            if status == "failed":
-                logger.error(
-                    f"{self.name}: Batch {batch_id} failed during processing"
-                )
-                # Trigger pipeline shutdown
-                if self.pipeline is not None:
-                    await self.pipeline.trigger_shutdown(
-                        reason=f"Batch processing failed: {batch_id}"
-                    )
-                # Don't forward to next stage
-                return None
+    async def handle_terminal(self, batch_id: str, outcome: Outcome) -> Any:
+        """Shut down on failed batches; forward (batch_id, output_file_id) once completed."""
+        status, output_file_id = outcome
 
-            # Check if batch is completed
-            if status == "completed":
-                if not output_file_id:
-                    logger.warning(
-                        f"{self.name}: Batch {batch_id} completed but no output_file_id found"
-                    )
-                    return None
-
-                logger.info(
-                    f"{self.name}: Batch {batch_id} completed successfully. "
-                    f"Output file: {output_file_id}"
+        # Check for failure state
+        if status == "failed":
+            logger.error(
+                f"{self.name}: Batch {batch_id} failed during processing"
+            )
+            # Trigger pipeline shutdown
+            if self.pipeline is not None:
+                await self.pipeline.trigger_shutdown(
+                    reason=f"Batch processing failed: {batch_id}"
                 )
-                # Forward to next stage
-                return batch_id, output_file_id
+            # Don't forward to next stage
+            return None
 
-            # Check if batch reached other terminal states (expired, cancelled, error)
-            if status in terminal_states:
+        # Check if batch is completed
+        if status == "completed":
+            if not output_file_id:
                 logger.warning(
-                    f"{self.name}: Batch {batch_id} reached terminal state: {status}"
+                    f"{self.name}: Batch {batch_id} completed but no output_file_id found"
                 )
-                # Trigger pipeline shutdown for unexpected terminal states
-                if self.pipeline is not None:
-                    await self.pipeline.trigger_shutdown(
-                        reason=f"Batch reached terminal state {status}: {batch_id}"
-                    )
                 return None
 
-            # Batch is still processing, wait before next poll
-            logger.debug(
-                f"{self.name}: Batch {batch_id} status={status}; "
-                f"sleeping {poll_interval}s before next poll"
+            logger.info(
+                f"{self.name}: Batch {batch_id} completed successfully. "
+                f"Output file: {output_file_id}"
+            )
+            # Forward to next stage
+            return batch_id, output_file_id
+
+        # Other terminal states (expired, cancelled, error)
+        logger.warning(
+            f"{self.name}: Batch {batch_id} reached terminal state: {status}"
+        )
+        # Trigger pipeline shutdown for unexpected terminal states
+        if self.pipeline is not None:
+            await self.pipeline.trigger_shutdown(
+                reason=f"Batch reached terminal state {status}: {batch_id}"
             )
-            await asyncio.sleep(poll_interval)
+        return None
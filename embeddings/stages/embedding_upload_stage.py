@@ -2,17 +2,21 @@
 
 This stage:
 - Receives (batch_id, output_file_id) tuples from BatchPollingStage
-- Downloads embeddings from OpenAI output file
-- Uploads embeddings to MongoDB embeddings collection
+- Streams embeddings from the OpenAI output file
+- Uploads them to MongoDB embeddings collection as they arrive, with up to
+  MAX_CONCURRENT_UPLOADS groups in flight while the download continues
 - Marks batch as processed in MongoDB
 """
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from typing import Any, List, Tuple
+
+import numpy as np
 
 from embeddings.config import logger
-from embeddings.openai_operations import download_batch_results
+from embeddings.openai_operations import stream_batch_results
 from embeddings.mongo_operations import upload_embeddings_to_mongo, mark_batch_as_processed
 from embeddings.stages.base_stage import PipelineStage
 
@@ -26,6 +30,18 @@ class EmbeddingUploadStage(PipelineStage):
     This is the final stage, so it does not forward items to any next stage.
     """
 
+    MAX_CONCURRENT_UPLOADS = 8  # Embedding groups being written to MongoDB at once per batch
+
+    async def _upload_group(
+        self, semaphore: asyncio.Semaphore, keys: List[Tuple[int, int]], vectors: np.ndarray
+    ) -> int:
+        """Upload one streamed group of embeddings, releasing its semaphore slot when done."""
+        try:
+            await upload_embeddings_to_mongo(keys, vectors)
+            return len(keys)
+        finally:
+            semaphore.release()
+
     async def process_item(self, item: Any) -> None:
         """Download embeddings from OpenAI and upload to MongoDB."""
         # Validate item structure
@@ -48,33 +64,40 @@ class EmbeddingUploadStage(PipelineStage):
         )
 
         try:
-            # 1. Download embeddings from OpenAI output file
+            # 1-2. Stream embeddings from the OpenAI output file and upload each
+            #      group to MongoDB while the rest of the file is still downloading
             logger.info(f"{self.name}: Downloading embeddings for batch {batch_id}...")
-            embeddings = await download_batch_results(batch_id, output_file_id)
-
-            if not embeddings:
+            # The download only waits for a free slot when MAX_CONCURRENT_UPLOADS
+            # groups are already being written
+            semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_UPLOADS)
+            upload_tasks: List[asyncio.Task] = []
+            try:
+                async for keys, vectors in stream_batch_results(batch_id, output_file_id):
+                    await semaphore.acquire()
+                    upload_tasks.append(
+                        asyncio.create_task(self._upload_group(semaphore, keys, vectors))
+                    )
+                # The batch only counts as processed once every upload has succeeded
+                uploaded_count = sum(await asyncio.gather(*upload_tasks))
+            except BaseException:
+                for task in upload_tasks:
+                    task.cancel()
+                await asyncio.gather(*upload_tasks, return_exceptions=True)
+                raise
+
+            if not uploaded_count:
                 logger.warning(
                     f"{self.name}: No embeddings downloaded for batch {batch_id}. "
                     "Skipping MongoDB upload."
                 )
                 return None
 
-            logger.info(
-                f"{self.name}: Downloaded {len(embeddings)} embeddings for batch {batch_id}"
-            )
-
-            # 2. Upload embeddings to MongoDB
-            logger.info(
-                f"{self.name}: Uploading {len(embeddings)} embeddings to MongoDB for batch {batch_id}..."
-            )
-            await upload_embeddings_to_mongo(embeddings)
-
             # 3. Mark batch as processed in MongoDB
             await mark_batch_as_processed(batch_id)
 
             logger.info(
                 f"{self.name}: Successfully processed batch {batch_id} "
-                f"({len(embeddings)} embeddings uploaded)"
+                f"({uploaded_count} embeddings uploaded)"
             )
 
             # This is the final stage, so return None (no next stage)
@@ -2,23 +2,25 @@
 
 This stage:
 - Receives (file_id, chunk_ids) items from FileUploadStage
-- Polls file status every 3 seconds until it reaches "processed" or "failed"
+- Waits on its completion source until each file reaches "processed" or "failed"
+  (by default polled from one loop, starting at 3 seconds and backing off with
+  jitter up to 30 seconds per file)
 - If "failed": Updates MongoDB and triggers pipeline shutdown
 - If "processed": Updates MongoDB and forwards (file_id, chunk_ids) to next stage
 """
 
 from __future__ import annotations
 
-import asyncio
-from typing import Any
+from typing import Any, Optional, Tuple
 
+from embeddings.completion_sources import Outcome
 from embeddings.config import logger
 from embeddings.openai_operations import poll_file_status
 from embeddings.mongo_operations import update_file_metadata_status
-from embeddings.stages.base_stage import PipelineStage
+from embeddings.stages.polling_stage import PollingStage
 
 
-class FilePollingStage(PipelineStage):
+class FilePollingStage(PollingStage):
     """Pipeline stage that polls file status until ready or failed.
 
     Input items are expected to be tuples of the form:
@@ -31,13 +33,13 @@ class FilePollingStage(PipelineStage):
         (file_id, chunk_ids)  # Only forwarded if file status is "processed"
     """
 
-    FILE_POLL_INTERVAL = 3  # Poll every 3 seconds
+    POLL_INTERVAL = 3  # Seconds before the first re-poll
+    MAX_POLL_INTERVAL = 30  # Upper bound for the backed-off interval
 
-    async def process_item(self, item: Any) -> Any:
-        """Poll file status until it reaches a terminal state (processed or failed)."""
-        # Validate item structure
+    def item_key(self, item: Any) -> Optional[str]:
+        """Validate a (file_id, chunk_ids) item and return its file_id."""
         try:
-            file_id, chunk_ids = item
+            file_id, _chunk_ids = item
         except Exception as e:  # noqa: BLE001
             logger.error(f"{self.name}: Invalid item shape for file polling: {item!r} ({e})")
             return None
@@ -45,44 +47,39 @@ class FilePollingStage(PipelineStage):
         if not isinstance(file_id, str):
             logger.error(f"{self.name}: file_id must be a string, got {type(file_id)}")
             return None
+        return file_id
 
-        logger.info(
-            f"{self.name}: Starting to poll file {file_id} for {len(chunk_ids)} chunks"
-        )
+    async def check_status(self, file_id: str) -> Tuple[bool, str, Any]:
+        """Poll file status once; done when it is processed or failed."""
+        status, is_ready = await poll_file_status(file_id)
 
-        # Poll file status until it reaches a terminal state
-        while True:
-            status, is_ready = await poll_file_status(file_id)
+        await update_file_metadata_status(file_id, status=status)
 
-            await update_file_metadata_status(file_id, status=status)
+        return is_ready or status == "failed", status, None
 
-            # Check for failure state
-            if status == "failed":
-                logger.error(
-                    f"{self.name}: File {file_id} failed during processing. "
-                    f"Affected chunks: {len(chunk_ids)}"
-                )
+    async def handle_terminal(self, item: Any, outcome: Outcome) -> Any:
+        """Shut down on a failed file; forward (file_id, chunk_ids) once it is processed."""
+        file_id, chunk_ids = item
+        status, _ = outcome
+
+        # Check for failure state
+        if status == "failed":
+            logger.error(
+                f"{self.name}: File {file_id} failed during processing. "
+                f"Affected chunks: {len(chunk_ids)}"
+            )
 
-                # Trigger pipeline shutdown
-                if self.pipeline is not None:
-                    await self.pipeline.trigger_shutdown(
-                        reason=f"File upload failed: {file_id}"
-                    )
-                # Don't forward to next stage
-                return None
-
-            # Check if file is ready (processed)
-            if is_ready:
-                logger.info(
-                    f"{self.name}: File {file_id} is ready (status: {status}) "
-                    f"for {len(chunk_ids)} chunks"
+            # Trigger pipeline shutdown
+            if self.pipeline is not None:
+                await self.pipeline.trigger_shutdown(
+                    reason=f"File upload failed: {file_id}"
                 )
-                # Forward to next stage
-                return file_id, chunk_ids
+            # Don't forward to next stage
+            return None
 
-            # File is still processing, wait before next poll
-            logger.debug(
-                f"{self.name}: File {file_id} status={status}; "
-                f"sleeping {self.FILE_POLL_INTERVAL}s before next poll"
-            )
-            await asyncio.sleep(self.FILE_POLL_INTERVAL)
+        logger.info(
+            f"{self.name}: File {file_id} is ready (status: {status}) "
+            f"for {len(chunk_ids)} chunks"
+        )
+        # Forward to next stage
+        return file_id, chunk_ids
@@ -3,12 +3,15 @@
 This stage:
 - Receives (chunk_ids, jsonl_content) items
 - Uploads the JSONL content to OpenAI via `submit_input_file`
-- Emits (file_id, chunk_ids) to the next stage
+- Buffers the file metadata and stores it with one bulk write per
+  METADATA_FLUSH_SIZE files (or whenever the stage goes idle, and on shutdown)
+- Emits (file_id, chunk_ids) to the next stage without waiting for that write
 """
 
 from __future__ import annotations
 
-from typing import Any
+import asyncio
+from typing import Any, List, Set, Tuple
 
 from embeddings.config import logger
 from embeddings.openai_operations import submit_input_file
@@ -23,12 +26,34 @@ class FileUploadStage(PipelineStage):
         (chunk_ids, jsonl_content)
     where:
         - chunk_ids: List[Tuple[int, int]]  # (qid, chunk_id)
-        - jsonl_content: str                # JSONL request body for embeddings
+        - jsonl_content: bytes              # JSONL request body for embeddings
 
     Output items (sent to `next_stage`) are tuples:
         (file_id, chunk_ids)
     """
 
+    METADATA_FLUSH_SIZE: int = 64  # Files per file-metadata bulk write
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        # (file_id, chunk_ids) pairs whose metadata has not been written yet
+        self._pending_metadata: List[Tuple[str, List[Tuple[int, int]]]] = []
+        # Background metadata writes, awaited on shutdown so none are lost
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    async def flush_metadata(self) -> None:
+        """Store the buffered file metadata in MongoDB with one bulk write."""
+        if not self._pending_metadata:
+            return
+        # Swap the buffer out first so workers can keep appending during the write
+        pending, self._pending_metadata = self._pending_metadata, []
+        try:
+            await store_file_metadata(pending, status="uploaded")
+        except Exception as e:  # noqa: BLE001 - metadata is bookkeeping only
+            logger.error(
+                f"{self.name}: Error storing metadata for {len(pending)} files: {e}"
+            )
+
     async def process_item(self, item: Any) -> Any:
         # Basic structural validation to fail fast if the item shape is wrong
         try:
@@ -37,8 +62,8 @@ class FileUploadStage(PipelineStage):
             logger.error(f"{self.name}: Invalid item shape for file upload: {item!r} ({e})")
             return None
 
-        if not isinstance(jsonl_content, str):
-            logger.error(f"{self.name}: jsonl_content must be a string, got {type(jsonl_content)}")
+        if not isinstance(jsonl_content, bytes):
+            logger.error(f"{self.name}: jsonl_content must be bytes, got {type(jsonl_content)}")
             return None
 
         try:
@@ -50,8 +75,17 @@ class FileUploadStage(PipelineStage):
             logger.info(
                 f"{self.name}: Uploaded batch file {file_id} for {len(chunk_ids)} chunks"
             )
-            # Store file metadata in MongoDB
-            await store_file_metadata(file_id, chunk_ids, status="uploaded")
+            # Buffer the file metadata; it is written in the background once
+            # enough files have piled up or no more uploads are queued, so the
+            # write stays off this item's path to the next stage
+            self._pending_metadata.append((file_id, chunk_ids))
+            if (
+                len(self._pending_metadata) >= self.METADATA_FLUSH_SIZE
+                or self.input_queue.empty()
+            ):
+                task = asyncio.create_task(self.flush_metadata())
+                self._flush_tasks.add(task)
+                task.add_done_callback(self._flush_tasks.discard)
             # Pass (file_id, chunk_ids) to the next stage
             return file_id, chunk_ids
         except Exception as e:  # noqa: BLE001 - log and drop this item
@@ -60,3 +94,9 @@ class FileUploadStage(PipelineStage):
                 f"({len(chunk_ids)} total): {e}"
             )
             return None
+
+    async def stop_workers(self) -> None:
+        """Stop the workers, then finish the metadata writes and flush the rest."""
+        await super().stop_workers()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        await self.flush_metadata()
@@ -0,0 +1,93 @@
+"""Completion-waiting stage base class for the embeddings pipeline.
+
+A polling stage hands each item's OpenAI ID to an `AsyncCompletionSource` and acts
+on the terminal outcome; how completion is detected (coalesced polling today,
+pushed events later) lives in the source, not in the stage.
+
+Each stage:
+- Runs a dispatcher that starts one lightweight task per queued item (see
+  DispatchingStage), so any number of items can be waiting at once
+- Awaits `completion_source.wait_terminal(key)` for the item
+- Applies a stage-specific `handle_terminal` and forwards its result
+
+Concrete stages subclass `PollingStage` and implement `item_key`, `check_status`
+(used by the default PollingCompletionSource) and `handle_terminal`.
+"""
+
+from __future__ import annotations
+
+from abc import abstractmethod
+from typing import Any, Optional, Tuple
+
+from embeddings.completion_sources import AsyncCompletionSource, Outcome, PollingCompletionSource
+from embeddings.stages.base_stage import DispatchingStage, PipelineStage
+
+
+class PollingStage(DispatchingStage):
+    """Pipeline stage that waits for items to reach a terminal state.
+
+    Subclasses set `POLL_INTERVAL` / `MAX_POLL_INTERVAL` (seconds) for the default
+    polling source. Another source (e.g. an EventCompletionSource fed by a webhook
+    handler) can be injected through `completion_source`.
+    """
+
+    POLL_INTERVAL: float = 3  # Seconds before the first re-poll
+    MAX_POLL_INTERVAL: float = 30  # Upper bound for the backed-off interval
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        next_stage: Optional[PipelineStage] = None,
+        completion_source: Optional[AsyncCompletionSource] = None,
+        queue_maxsize: Optional[int] = None,
+    ) -> None:
+        super().__init__(
+            name=name,
+            max_concurrent=max_concurrent,
+            next_stage=next_stage,
+            queue_maxsize=queue_maxsize,
+        )
+        # With the polling source, max_concurrent bounds concurrent status requests
+        # rather than the number of items being waited on
+        self.completion_source: AsyncCompletionSource = completion_source or PollingCompletionSource(
+            name=name,
+            check=self.check_status,
+            poll_interval=self.POLL_INTERVAL,
+            max_poll_interval=self.MAX_POLL_INTERVAL,
+            max_concurrent=max_concurrent,
+        )
+
+    @abstractmethod
+    def item_key(self, item: Any) -> Optional[str]:
+        """Validate an input item and return the OpenAI ID to wait on (None to drop it)."""
+
+    @abstractmethod
+    async def check_status(self, key: str) -> Tuple[bool, str, Any]:
+        """Poll `key` once (used by the polling completion source).
+
+        Returns:
+            Tuple of (done, status, payload); done is True once the status is terminal
+        """
+
+    @abstractmethod
+    async def handle_terminal(self, item: Any, outcome: Outcome) -> Any:
+        """Act on an item's terminal (status, payload) and return what to forward (or None)."""
+
+    async def process_item(self, item: Any) -> Any:
+        """Wait for an item to reach a terminal state and handle it."""
+        key = self.item_key(item)
+        if key is None:
+            return None
+
+        outcome = await self.completion_source.wait_terminal(key)
+        return await self.handle_terminal(item, outcome)
+
+    async def stop_workers(self) -> None:
+        """Stop the dispatcher, cancel outstanding waits and close the completion source.
+
+        Waiters only await a completion (no partial writes), so they are cancelled
+        rather than drained.
+        """
+        await super().stop_workers()
+        await self.completion_source.close()
@@ -1,13 +1,11 @@
 import asyncio
 import sys
 from pathlib import Path
-from dotenv import load_dotenv
-
-load_dotenv()
 
 # Ensure the project root is on the Python path
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
 from embeddings.config import async_mongo_client, db, logger
 
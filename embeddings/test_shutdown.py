@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from pathlib import Path
+
+# Ensure the project root is on the Python path
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from embeddings.config import logger
+from embeddings.pipeline import EmbeddingPipeline
+from embeddings.stages.base_stage import PipelineStage
+
+
+class SlowStage(PipelineStage):
+    """Stage that holds each item for `delay` seconds before forwarding it."""
+
+    def __init__(self, name: str, delay: float) -> None:
+        super().__init__(name, max_concurrent=1, queue_maxsize=1)
+        self.delay = delay
+
+    async def process_item(self, item):
+        await asyncio.sleep(self.delay)
+        return item
+
+
+async def test_shutdown_with_item_in_flight() -> None:
+    """Shut the pipeline down while an item is mid-flight and check nothing is left unfinished."""
+    upload = SlowStage("upload", delay=0.2)
+    downstream = SlowStage("downstream", delay=0.01)
+    pipeline = EmbeddingPipeline()
+    pipeline.add_stage(upload)
+    pipeline.add_stage(downstream)
+    await pipeline.start()
+
+    # One item being processed by upload, one queued, one producer waiting on the full queue
+    await pipeline.enqueue("a")
+    await asyncio.sleep(0.05)
+    await pipeline.enqueue("b")
+    producer = asyncio.create_task(pipeline.enqueue("c"))
+    await asyncio.sleep(0.05)
+
+    await pipeline.shutdown()
+    await asyncio.wait_for(producer, timeout=1)
+    # join() on every stage must return rather than hang on a dropped item
+    await asyncio.wait_for(pipeline.wait_for_completion(), timeout=1)
+
+    leftover = [(stage.name, stage.input_queue.qsize()) for stage in pipeline.stages]
+    assert all(size == 0 for _, size in leftover), leftover
+    logger.info("Shutdown with an item in flight completed cleanly")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_shutdown_with_item_in_flight())
@@ -0,0 +1,94 @@
+"""
+Shared MongoDB and OpenAI clients for the RAG testing modules.
+
+This module handles:
+- Creating one pooled AsyncMongoClient and one AsyncOpenAI client on first use
+- Ensuring the indexes the RAG lookups query on exist
+- Closing both once, when the script is done with them
+"""
+
+from functools import lru_cache
+from pymongo import AsyncMongoClient
+from openai import AsyncOpenAI
+import certifi
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Configuration
+MONGODB_URL = os.getenv("MONGODB_URL")
+OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+DATABASE_NAME = "leetcode_questions"
+
+
+@lru_cache(maxsize=None)
+def get_mongo_client() -> AsyncMongoClient:
+    """
+    Return the shared MongoDB async client, creating it on first use.
+
+    Every query in the process goes through this client's connection pool, so
+    TLS handshakes are paid once per pooled connection rather than per script step.
+
+    Returns:
+        MongoDB async client
+    """
+    return AsyncMongoClient(
+        MONGODB_URL,
+        tlsCAFile=certifi.where(),
+        maxPoolSize=50,
+        minPoolSize=5,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_openai_client() -> AsyncOpenAI:
+    """
+    Return the shared OpenAI async client, creating it on first use.
+
+    Returns:
+        OpenAI async client
+    """
+    return AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+
+async def close_clients() -> None:
+    """
+    Close whichever shared clients were created.
+
+    Async clients have to be closed on the event loop that used them, so scripts
+    call this at the end of main() rather than from an atexit hook.
+    """
+    if get_openai_client.cache_info().currsize:
+        await get_openai_client().close()
+        get_openai_client.cache_clear()
+    if get_mongo_client.cache_info().currsize:
+        await get_mongo_client().close()
+        get_mongo_client.cache_clear()
+
+
+async def ensure_indexes() -> None:
+    """
+    Create the indexes the RAG lookups query on, if they are missing.
+    
+    The chunk text finds match on (qid, chunk_id) and the summary/metadata finds
+    on qid. Existing indexes are checked first (via index_information), so the
+    index specs are only sent to the server when an index is actually missing.
+    """
+    db = get_mongo_client()[DATABASE_NAME]
+    indexes = [
+        (db["chunks"], [("qid", 1), ("chunk_id", 1)], {"unique": True, "name": "qid_chunk_id_unique"}),
+        (db["question_metadata"], [("qid", 1)], {"unique": True, "name": "qid_1"}),
+        (db["question_summaries"], [("qid", 1)], {"name": "qid_1"}),
+    ]
+    
+    for collection, keys, options in indexes:
+        try:
+            existing_indexes = await collection.index_information()
+            if any(index["key"] == keys for index in existing_indexes.values()):
+                continue
+            
+            await collection.create_index(keys, **options)
+            print(f"Created index {options['name']} on {collection.name}")
+        except Exception as e:
+            print(f"Could not create index {options['name']} on {collection.name}: {e}")
@@ -4,20 +4,27 @@ Fetch question summary and metadata from MongoDB.
 This module retrieves question summaries and metadata for RAG context.
 """
 
+import asyncio
 from typing import Dict, Any, Optional, List
 from pymongo import AsyncMongoClient
-import certifi
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-# Configuration
-MONGODB_URL = os.getenv("MONGODB_URL")
+# Configuration (the client, and the .env it is built from, come from clients.py)
 DATABASE_NAME = "leetcode_questions"
 SUMMARIES_COLLECTION = "question_summaries"
 METADATA_COLLECTION = "question_metadata"
 
+# Only the fields format_question_document reads are sent back by MongoDB
+SUMMARY_PROJECTION = {"_id": 0, "qid": 1, "summary": 1}
+METADATA_PROJECTION = {
+    "_id": 0,
+    "qid": 1,
+    "title": 1,
+    "difficulty": 1,
+    "topics": 1,
+    "hints": 1,
+    "question_body": 1,
+}
+
 
 async def fetch_question_data(qid: int, client: AsyncMongoClient) -> Optional[Dict[str, Any]]:
     """
@@ -35,11 +42,11 @@ async def fetch_question_data(qid: int, client: AsyncMongoClient) -> Optional[Di
     metadata_collection = db[METADATA_COLLECTION]
     
     # Fetch summary
-    summary_doc = await summaries_collection.find_one({"qid": qid})
+    summary_doc = await summaries_collection.find_one({"qid": qid}, SUMMARY_PROJECTION)
     summary = summary_doc.get("summary") if summary_doc else None
     
     # Fetch metadata
-    metadata_doc = await metadata_collection.find_one({"qid": qid})
+    metadata_doc = await metadata_collection.find_one({"qid": qid}, METADATA_PROJECTION)
     
     if not metadata_doc:
         return None
@@ -55,16 +62,32 @@ async def fetch_multiple_question_data(qids: List[int], client: AsyncMongoClient
     """
     Fetch summaries and metadata for multiple questions.
     
+    Each collection is queried once for all qids (`$in`), and the two queries
+    run concurrently, instead of two round-trips per question.
+    
     Args:
         qids: List of question IDs
         client: MongoDB async client
     
     Returns:
-        Dictionary mapping qid to question data
+        Dictionary mapping qid to question data (in the order of qids)
     """
-    results = {}
-    for qid in qids:
-        data = await fetch_question_data(qid, client)
-        if data:
-            results[qid] = data
-    return results
+    db = client[DATABASE_NAME]
+    query = {"qid": {"$in": qids}}
+    
+    summary_docs, metadata_docs = await asyncio.gather(
+        db[SUMMARIES_COLLECTION].find(query, SUMMARY_PROJECTION).to_list(),
+        db[METADATA_COLLECTION].find(query, METADATA_PROJECTION).to_list(),
+    )
+    summaries = {doc["qid"]: doc.get("summary") for doc in summary_docs}
+    metadata = {doc["qid"]: doc for doc in metadata_docs}
+    
+    return {
+        qid: {
+            "qid": qid,
+            "summary": summaries.get(qid),
+            "metadata": metadata[qid]
+        }
+        for qid in qids
+        if qid in metadata
+    }
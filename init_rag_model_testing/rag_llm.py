@@ -1,38 +1,40 @@
 """
 RAG LLM module for reasoning about questions using OpenAI.
 
-This module handles calling OpenAI's chat API with RAG context.
+This module handles calling OpenAI's chat API with RAG context, either streaming
+the answer as it is generated or returning it once complete.
 """
 
-from typing import List
+from typing import AsyncIterator, Dict, List
 from openai import AsyncOpenAI
-import os
-from dotenv import load_dotenv
 
-load_dotenv()
-
-# Configuration
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# Configuration (the client, and the .env it is built from, come from clients.py)
 MODEL = "gpt-5-nano-2025-08-07"  # Using gpt-4o-mini as requested
 
 
-async def generate_rag_response(query: str, context_documents: List[str], client: AsyncOpenAI) -> str:
+def build_rag_messages(query: str, context_documents: List[str]) -> List[Dict[str, str]]:
     """
-    Generate a response using RAG with OpenAI's chat API.
+    Build the chat messages (system prompt, then context and query) for a RAG call.
     
     Args:
         query: User query/question
         context_documents: List of formatted context documents
-        client: OpenAI async client
     
     Returns:
-        Generated response string
+        Chat messages for the completions API
     """
-    # Combine context documents
-    context = "\n\n".join([
-        f"--- Document {i+1} ---\n{doc}" 
-        for i, doc in enumerate(context_documents)
-    ])
+    # Combine context documents: "--- Document i ---" header, then the document,
+    # with a blank line between documents (pieces appended, joined once)
+    pieces = []
+    append = pieces.append
+    for i, doc in enumerate(context_documents, 1):
+        if i > 1:
+            append("\n\n")
+        append("--- Document ")
+        append(str(i))
+        append(" ---\n")
+        append(doc)
+    context = "".join(pieces)
     
     # System prompt for RAG
     system_prompt = """You are a helpful assistant that answers questions about LeetCode problems using the provided context documents. 
@@ -57,13 +59,54 @@ Format your response with:
 - Your answer to the query
 - A "Document Rankings and Justifications" section listing each document with its ranking and justification"""
 
-    # Call OpenAI API
-    response = await client.chat.completions.create(
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_message}
+    ]
+
+
+async def stream_rag_response(
+    query: str,
+    context_documents: List[str],
+    client: AsyncOpenAI,
+) -> AsyncIterator[str]:
+    """
+    Generate a response using RAG with OpenAI's chat API, streaming it.
+    
+    Text is yielded as the model produces it, so callers can show the start of
+    the answer without waiting for the whole completion.
+    
+    Args:
+        query: User query/question
+        context_documents: List of formatted context documents
+        client: OpenAI async client
+    
+    Yields:
+        Pieces of the generated response, in order
+    """
+    stream = await client.chat.completions.create(
         model=MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_message}
-        ],
+        messages=build_rag_messages(query, context_documents),
+        stream=True,
     )
+    async for event in stream:
+        if not event.choices:
+            continue
+        delta = event.choices[0].delta.content
+        if delta:
+            yield delta
+
+
+async def generate_rag_response(query: str, context_documents: List[str], client: AsyncOpenAI) -> str:
+    """
+    Generate a response using RAG with OpenAI's chat API.
+    
+    Args:
+        query: User query/question
+        context_documents: List of formatted context documents
+        client: OpenAI async client
     
-    return response.choices[0].message.content
+    Returns:
+        Generated response string
+    """
+    return "".join([delta async for delta in stream_rag_response(query, context_documents, client)])
@@ -9,29 +9,18 @@ This script:
 
 import asyncio
 import sys
-from pathlib import Path
 from typing import List, Dict, Any
-from dotenv import load_dotenv
-
-# Ensure the project root is on the Python path
-project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
 
 from pymongo import AsyncMongoClient
-import certifi
 from openai import AsyncOpenAI
-import os
 
-# Import RAG modules
+# Import RAG modules (siblings of this script, so already importable)
+from clients import close_clients, ensure_indexes, get_mongo_client, get_openai_client
 from fetch_question_data import fetch_multiple_question_data
 from format_documents import format_multiple_documents
-from rag_llm import generate_rag_response
-
-load_dotenv()
+from rag_llm import stream_rag_response
 
 # Configuration
-MONGODB_URL = os.getenv("MONGODB_URL")
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 EMBEDDING_MODEL = "text-embedding-3-large"
 EMBEDDING_DIMENSIONS = 1024
 
@@ -41,33 +30,171 @@ EMBEDDINGS_COLLECTION = "embeddings"
 CHUNKS_COLLECTION = "chunks"
 METADATA_COLLECTION = "question_metadata"
 VECTOR_INDEX_NAME = "summary_chunk_embeddings"
+VECTOR_SEARCH_LIMIT = 5  # Number of chunks returned per query
+# Approximate (HNSW) search over this many candidates; set VECTOR_SEARCH_EXACT to
+# score every embedding instead, e.g. to measure the recall difference
+VECTOR_SEARCH_NUM_CANDIDATES = 100
+VECTOR_SEARCH_EXACT = False
 
 
-async def get_embedding(text: str) -> List[float]:
+async def get_embeddings(texts: List[str], client: AsyncOpenAI) -> List[List[float]]:
     """
-    Generate embedding for a text string using OpenAI.
+    Generate embeddings for several text strings in one OpenAI request.
     
     Args:
-        text: Input text to embed
+        texts: Input texts to embed
+        client: OpenAI async client (reused so its connection pool is shared)
     
     Returns:
-        List of floats representing the embedding vector
+        One embedding vector per input text, in the same order
     """
-    client = AsyncOpenAI(api_key=OPENAI_API_KEY)
     response = await client.embeddings.create(
         model=EMBEDDING_MODEL,
-        input=text,
+        input=texts,
         dimensions=EMBEDDING_DIMENSIONS,
     )
-    return response.data[0].embedding
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+async def get_embedding(text: str, client: AsyncOpenAI) -> List[float]:
+    """
+    Generate embedding for a text string using OpenAI.
+    
+    Args:
+        text: Input text to embed
+        client: OpenAI async client (reused so its connection pool is shared)
+    
+    Returns:
+        List of floats representing the embedding vector
+    """
+    embeddings = await get_embeddings([text], client)
+    return embeddings[0]
+
+
+async def search_hits(query_embedding: List[float], client: AsyncMongoClient) -> List[Dict[str, Any]]:
+    """
+    Run the vector search for one query embedding, without any hit details.
+    
+    Args:
+        query_embedding: Embedding of the query string
+        client: MongoDB async client
+    
+    Returns:
+        List of hits with qid, chunk_id and score
+    """
+    embeddings_collection = client[DATABASE_NAME][EMBEDDINGS_COLLECTION]
+    
+    # Vector search aggregation pipeline
+    vector_search_stage = {
+        "index": VECTOR_INDEX_NAME,
+        "queryVector": query_embedding,
+        "path": "embedding",
+        "limit": VECTOR_SEARCH_LIMIT
+    }
+    if VECTOR_SEARCH_EXACT:
+        vector_search_stage["exact"] = True
+    else:
+        vector_search_stage["numCandidates"] = VECTOR_SEARCH_NUM_CANDIDATES
+    
+    pipeline = [
+        {"$vectorSearch": vector_search_stage},
+        {
+            "$project": {
+                "_id": 0,
+                "qid": 1,
+                "chunk_id": 1,
+                "score": {"$meta": "vectorSearchScore"}
+            }
+        }
+    ]
+    
+    # Execute aggregation (aggregate() returns a coroutine that must be awaited);
+    # the top-k hits come back as one list instead of document by document
+    cursor = await embeddings_collection.aggregate(pipeline)
+    return await cursor.to_list(length=VECTOR_SEARCH_LIMIT)
+
+
+async def add_hit_details(results: List[Dict[str, Any]], client: AsyncMongoClient) -> List[Dict[str, Any]]:
+    """
+    Add the matched chunk text, question title and first chunk text to search hits.
+    
+    The three lookups are batched finds that run concurrently, instead of per-hit
+    $lookup sub-pipelines.
+    
+    Args:
+        results: Hits from search_hits (updated in place)
+        client: MongoDB async client
+    
+    Returns:
+        The same hits, with the details that were found
+    """
+    if not results:
+        return results
+    
+    db = client[DATABASE_NAME]
+    chunks_collection = db[CHUNKS_COLLECTION]
+    metadata_collection = db[METADATA_COLLECTION]
+    
+    qids = list({doc["qid"] for doc in results})
+    pairs = {(doc["qid"], doc["chunk_id"]) for doc in results}
+    chunk_docs, first_chunk_docs, metadata_docs = await asyncio.gather(
+        chunks_collection.find(
+            {"$or": [{"qid": qid, "chunk_id": chunk_id} for qid, chunk_id in pairs]},
+            {"_id": 0, "qid": 1, "chunk_id": 1, "text": 1},
+        ).to_list(length=len(pairs)),
+        chunks_collection.find(
+            {"qid": {"$in": qids}, "chunk_id": 1},
+            {"_id": 0, "qid": 1, "text": 1},
+        ).to_list(length=len(qids)),
+        metadata_collection.find(
+            {"qid": {"$in": qids}},
+            {"_id": 0, "qid": 1, "title": 1},
+        ).to_list(length=len(qids)),
+    )
+    chunk_texts = {(doc["qid"], doc["chunk_id"]): doc.get("text") for doc in chunk_docs}
+    first_chunk_texts = {doc["qid"]: doc.get("text") for doc in first_chunk_docs}
+    titles = {doc["qid"]: doc.get("title") for doc in metadata_docs}
+    
+    # Merge in memory; like the old unwinds, missing matches just leave the field out
+    for doc in results:
+        qid = doc["qid"]
+        for field, value in (
+            ("text", chunk_texts.get((qid, doc["chunk_id"]))),
+            ("title", titles.get(qid)),
+            ("first_chunk_text", first_chunk_texts.get(qid)),
+        ):
+            if value is not None:
+                doc[field] = value
+    return results
+
+
+async def vector_search(query_embedding: List[float], client: AsyncMongoClient) -> List[Dict[str, Any]]:
+    """
+    Run the vector search for one query embedding and add the hit details.
+    
+    Args:
+        query_embedding: Embedding of the query string
+        client: MongoDB async client
+    
+    Returns:
+        List of matching documents
+    """
+    results = await search_hits(query_embedding, client)
+    return await add_hit_details(results, client)
 
 
-async def get_query_results(query: str, client: AsyncMongoClient) -> List[Dict[str, Any]]:
+async def get_query_results(
+    query: str,
+    client: AsyncMongoClient,
+    openai_client: AsyncOpenAI,
+) -> List[Dict[str, Any]]:
     """
     Get vector search results for a query string.
     
     Args:
         query: Query string to search for
+        client: MongoDB async client
+        openai_client: OpenAI async client used to embed the query
     
     Returns:
         List of matching documents
@@ -75,150 +202,11 @@ async def get_query_results(query: str, client: AsyncMongoClient) -> List[Dict[s
     try:
         # Get embedding for the query
         print(f"Generating embedding for query: '{query}'...")
-        query_embedding = await get_embedding(query)
+        query_embedding = await get_embedding(query, openai_client)
         print(f"Embedding generated (dimensions: {len(query_embedding)})")
         
-        # Access database and collection
-        db = client[DATABASE_NAME]
-        embeddings_collection = db[EMBEDDINGS_COLLECTION]
-        
-        # Vector search aggregation pipeline with join to chunks collection
-        pipeline = [
-            {
-                "$vectorSearch": {
-                    "index": VECTOR_INDEX_NAME,
-                    "queryVector": query_embedding,
-                    "path": "embedding",
-                    "exact": True,
-                    "limit": 5
-                }
-            },
-            {
-                "$project": {
-                    "_id": 0,
-                    "qid": 1,
-                    "chunk_id": 1,
-                    "score": {"$meta": "vectorSearchScore"}
-                }
-            },
-            {
-                "$lookup": {
-                    "from": CHUNKS_COLLECTION,
-                    "let": {"embedding_qid": "$qid", "embedding_chunk_id": "$chunk_id"},
-                    "pipeline": [
-                        {
-                            "$match": {
-                                "$expr": {
-                                    "$and": [
-                                        {"$eq": ["$qid", "$$embedding_qid"]},
-                                        {"$eq": ["$chunk_id", "$$embedding_chunk_id"]}
-                                    ]
-                                }
-                            }
-                        },
-                        {
-                            "$project": {
-                                "_id": 0,
-                                "text": 1
-                            }
-                        }
-                    ],
-                    "as": "chunk_data"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$chunk_data",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            {
-                "$project": {
-                    "qid": 1,
-                    "chunk_id": 1,
-                    "score": 1,
-                    "text": "$chunk_data.text"
-                }
-            },
-            {
-                "$lookup": {
-                    "from": METADATA_COLLECTION,
-                    "let": {"embedding_qid": "$qid"},
-                    "pipeline": [
-                        {
-                            "$match": {
-                                "$expr": {
-                                    "$eq": ["$qid", "$$embedding_qid"]
-                                }
-                            }
-                        },
-                        {
-                            "$project": {
-                                "_id": 0,
-                                "title": 1
-                            }
-                        }
-                    ],
-                    "as": "metadata"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$metadata",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            {
-                "$lookup": {
-                    "from": CHUNKS_COLLECTION,
-                    "let": {"embedding_qid": "$qid"},
-                    "pipeline": [
-                        {
-                            "$match": {
-                                "$expr": {
-                                    "$and": [
-                                        {"$eq": ["$qid", "$$embedding_qid"]},
-                                        {"$eq": ["$chunk_id", 1]}
-                                    ]
-                                }
-                            }
-                        },
-                        {
-                            "$project": {
-                                "_id": 0,
-                                "text": 1
-                            }
-                        },
-                        {"$limit": 1}
-                    ],
-                    "as": "first_chunk"
-                }
-            },
-            {
-                "$unwind": {
-                    "path": "$first_chunk",
-                    "preserveNullAndEmptyArrays": True
-                }
-            },
-            {
-                "$project": {
-                    "qid": 1,
-                    "chunk_id": 1,
-                    "score": 1,
-                    "text": 1,
-                    "title": "$metadata.title",
-                    "first_chunk_text": "$first_chunk.text"
-                }
-            }
-        ]
-        
         print(f"Performing vector search with index '{VECTOR_INDEX_NAME}'...")
-        
-        # Execute aggregation (aggregate() returns a coroutine that must be awaited)
-        cursor = await embeddings_collection.aggregate(pipeline)
-        results = []
-        async for doc in cursor:
-            results.append(doc)
+        results = await vector_search(query_embedding, client)
         
         print(f"Found {len(results)} results")
         return results
@@ -228,6 +216,34 @@ async def get_query_results(query: str, client: AsyncMongoClient) -> List[Dict[s
         raise
 
 
+async def get_multiple_query_results(
+    queries: List[str],
+    client: AsyncMongoClient,
+    openai_client: AsyncOpenAI,
+) -> List[List[Dict[str, Any]]]:
+    """
+    Get vector search results for several query strings.
+    
+    All queries are embedded in a single OpenAI request, then their vector
+    searches run concurrently.
+    
+    Args:
+        queries: Query strings to search for
+        client: MongoDB async client
+        openai_client: OpenAI async client used to embed the queries
+    
+    Returns:
+        One list of matching documents per query, in the same order
+    """
+    print(f"Generating embeddings for {len(queries)} queries...")
+    query_embeddings = await get_embeddings(queries, openai_client)
+    
+    print(f"Performing {len(queries)} vector searches with index '{VECTOR_INDEX_NAME}'...")
+    return list(await asyncio.gather(
+        *(vector_search(query_embedding, client) for query_embedding in query_embeddings)
+    ))
+
+
 async def main() -> None:
     """Main function to run the vector search test."""
     # Get query from command line argument or use default
@@ -241,37 +257,49 @@ async def main() -> None:
         print()
     
     # Connect to MongoDB and OpenAI
-    mongo_client = AsyncMongoClient(MONGODB_URL, tlsCAFile=certifi.where())
-    openai_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
+    mongo_client = get_mongo_client()
+    openai_client = get_openai_client()
     
     try:
-        # 1. Perform vector search
-        results = await get_query_results(query, mongo_client)
+        await ensure_indexes()
         
-        print(f"\n{'='*80}")
-        print(f"Vector Search Results for: '{query}'")
-        print(f"{'='*80}\n")
+        # 1. Perform vector search
+        print(f"Generating embedding for query: '{query}'...")
+        query_embedding = await get_embedding(query, openai_client)
+        print(f"Performing vector search with index '{VECTOR_INDEX_NAME}'...")
+        results = await search_hits(query_embedding, mongo_client)
         
         if not results:
             print("No results found.")
             return
         
+        # Several chunks can hit the same question; fetch each question once,
+        # in order of its best hit
+        qids = list(dict.fromkeys(doc["qid"] for doc in results))
+        
+        # 2. Fetch the hit details (for display) together with the question
+        # summaries and metadata (for the RAG context); both only need the hits
+        print("Fetching hit details, question summaries and metadata...")
+        results, questions_data = await asyncio.gather(
+            add_hit_details(results, mongo_client),
+            fetch_multiple_question_data(qids, mongo_client),
+        )
+        
+        print(f"\n{'='*80}")
+        print(f"Vector Search Results for: '{query}'")
+        print(f"{'='*80}\n")
+        
         # Display search results
-        qids = []
         for i, doc in enumerate(results, 1):
             problem_title = doc.get('title', 'Unknown')
             qid = doc.get('qid')
             chunk_id = doc.get('chunk_id')
-            qids.append(qid)
             print(f"{problem_title} | QID: {qid} | Chunk ID: {chunk_id}")
         
         print(f"{'='*80}")
         print(f"Total results: {len(results)}")
         print(f"{'='*80}\n")
         
-        # 2. Fetch question summaries and metadata
-        print("Fetching question summaries and metadata...")
-        questions_data = await fetch_multiple_question_data(qids, mongo_client)
         print(f"Fetched data for {len(questions_data)} questions\n")
         
         # 3. Format documents
@@ -282,8 +310,10 @@ async def main() -> None:
         # 4. Generate RAG response
         print("Generating RAG response with OpenAI...")
         print(f"{'='*80}")
-        rag_response = await generate_rag_response(query, documents, openai_client)
-        print(rag_response)
+        # Print the answer as it streams in rather than after the whole completion
+        async for delta in stream_rag_response(query, documents, openai_client):
+            print(delta, end="", flush=True)
+        print()
         print(f"{'='*80}")
             
     except Exception as e:
@@ -291,7 +321,7 @@ async def main() -> None:
         import traceback
         traceback.print_exc()
     finally:
-        await mongo_client.close()
+        await close_clients()
 
 
 if __name__ == "__main__":
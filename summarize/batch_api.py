@@ -8,17 +8,16 @@ This module handles:
 - Downloading batch results
 """
 
-import json
-import asyncio
-from io import BytesIO
+import orjson
 from typing import List, Dict, Tuple
 
 from summarize.config import llm_client, logger, BATCH_SIZE
-from summarize.summary_prompt import SUMMARY_GENERATION_PROMPT
+from summarize.summary_prompt import SUMMARY_GENERATION_PROMPT, SUMMARY_PROMPT_CACHE_KEY
 from utils.utils import extract_qid_from_custom_id, extract_summary_from_result
 
-# don't use this anymore since we are redoing failed batcehs
-def create_batch_files(problems: List[Dict], batch_size: int = int(BATCH_SIZE)) -> List[Tuple[List[int], str]]:
+def create_batch_files(
+    problems: List[Dict], batch_size: int = int(BATCH_SIZE), model: str = "gpt-5.1-nano"
+) -> List[Tuple[List[int], bytes]]:
     """
     Create JSONL content in memory for batch processing.
     This is a synchronous function as it only performs in-memory data transformation.
@@ -26,9 +25,10 @@ def create_batch_files(problems: List[Dict], batch_size: int = int(BATCH_SIZE))
     Args:
         problems: List of dicts with 'qid' and 'problem_data_text' keys
         batch_size: Number of requests per batch
+        model: Model that generates the summaries
     
     Returns:
-        List of tuples: (list of qids in batch, JSONL content string)
+        List of tuples: (list of qids in batch, JSONL content as UTF-8 bytes)
     """
     batches = []
     
@@ -44,41 +44,38 @@ def create_batch_files(problems: List[Dict], batch_size: int = int(BATCH_SIZE))
                 "method": "POST",
                 "url": "/v1/responses",
                 "body": {
-                    "model": "gpt-5.1-nano",
+                    "model": model,
                     "instructions": SUMMARY_GENERATION_PROMPT,
+                    "prompt_cache_key": SUMMARY_PROMPT_CACHE_KEY,
                     "input": f"Problem data:\n\n{problem['problem_data_text']}",
                     "reasoning": {"effort": "medium"},
                     "text": {"verbosity": "low"}
                 }
             }
-            jsonl_lines.append(json.dumps(request_data))
+            jsonl_lines.append(orjson.dumps(request_data))
         
-        jsonl_content = "\n".join(jsonl_lines)
+        jsonl_content = b"\n".join(jsonl_lines)
         batches.append((qids, jsonl_content))
     
     return batches
 
 
-async def upload_batch_file(jsonl_content: str) -> str:
+async def upload_batch_file(jsonl_content: bytes) -> str:
     """
     Upload JSONL content to OpenAI as a file.
     
+    The bytes are handed to the SDK as a (filename, content) pair, so they are
+    uploaded as built, without an encode or a file-like wrapper.
+    
     Args:
-        jsonl_content: JSONL content as string
+        jsonl_content: JSONL content as UTF-8 bytes
     
     Returns:
         file_id: OpenAI file ID
     """
-    # Convert string to bytes
-    jsonl_bytes = jsonl_content.encode('utf-8')
-    
-    # Create a file-like object with name attribute (required by OpenAI SDK)
-    file_obj = BytesIO(jsonl_bytes)
-    file_obj.name = "batch.jsonl"
-    
-    # Upload file - OpenAI SDK expects a file-like object
+    # The filename tells OpenAI the content is JSONL
     file_response = await llm_client.files.create(
-        file=file_obj,
+        file=("batch.jsonl", jsonl_content),
         purpose="batch"
     )
     
@@ -114,6 +111,9 @@ async def download_batch_results(batch_id: str, output_file_id: str) -> Dict[int
     IMPORTANT: This function downloads content IN MEMORY ONLY - no files are written to disk.
     All content is processed in memory and never saved locally.
     
+    The output file is streamed and parsed line by line as it arrives, so only the
+    current line and the parsed summaries are held in memory, never the whole file.
+    
     Args:
         batch_id: OpenAI batch ID
         output_file_id: OpenAI output file ID
@@ -122,35 +122,30 @@ async def download_batch_results(batch_id: str, output_file_id: str) -> Dict[int
         Dict mapping qid to summary text
     """
     try:
-        # Download file content IN MEMORY ONLY - no disk writes
-        # OpenAI SDK returns file content - handle both streaming and non-streaming responses
-        file_response = await llm_client.files.content(output_file_id)
-        content = file_response.text
-
-        # Parse JSONL (in memory)
+        # Stream the file content IN MEMORY ONLY - no disk writes
         results = {}
-        for line in content.strip().split('\n'):
-            if not line:
-                continue
-            try:
-                result_data = json.loads(line)
-            except json.JSONDecodeError as e:
-                logger.warning(f"Error parsing JSON line: {e}")
-                continue
-            
-            # Extract QID from custom_id
-            custom_id = result_data.get('custom_id', '')
-            qid = extract_qid_from_custom_id(custom_id)
-            if qid is None:
-                logger.debug(f"Skipping line with invalid custom_id: {custom_id}")
-                continue
-            
-            # Extract summary from result data
-            summary = extract_summary_from_result(result_data, qid)
-            if summary:
-                results[qid] = summary
+        async with llm_client.files.with_streaming_response.content(output_file_id) as response:
+            async for line in response.iter_lines():
+                if not line.strip():
+                    continue
+                try:
+                    result_data = orjson.loads(line)
+                except orjson.JSONDecodeError as e:
+                    logger.warning(f"Error parsing JSON line: {e}")
+                    continue
+                
+                # Extract QID from custom_id
+                custom_id = result_data.get('custom_id', '')
+                qid = extract_qid_from_custom_id(custom_id)
+                if qid is None:
+                    logger.debug(f"Skipping line with invalid custom_id: {custom_id}")
+                    continue
+                
+                # Extract summary from result data
+                summary = extract_summary_from_result(result_data, qid)
+                if summary:
+                    results[qid] = summary
         
-        # Content is automatically garbage collected - no files on disk to delete
         return results
     except Exception as e:
         logger.error(f"Error downloading results for batch {batch_id}: {e}")
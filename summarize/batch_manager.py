@@ -10,7 +10,7 @@ This module handles:
 
 import asyncio
 from datetime import datetime
-from typing import List, Dict, Tuple
+from typing import List, Dict, Optional, Set, Tuple
 
 from tqdm.asyncio import tqdm as async_tqdm
 
@@ -86,14 +86,14 @@ async def resume_batch_processing():
     return batch_ids
 
 
-async def submit_batches_async(batch_contents: List[Tuple[List[int], str]], max_concurrent: int = int(MAX_CONCURRENT_BATCH_SUBMISSIONS)) -> List[str]:
+async def submit_batches_async(batch_contents: List[Tuple[List[int], bytes]], max_concurrent: int = int(MAX_CONCURRENT_BATCH_SUBMISSIONS)) -> List[str]:
     """
     Submit multiple batches in parallel with concurrency control.
     
     For each batch: upload file → create batch → store metadata
     
     Args:
-        batch_contents: List of (qids, jsonl_content) tuples
+        batch_contents: List of (qids, jsonl_content) tuples, jsonl_content as UTF-8 bytes
         max_concurrent: Maximum concurrent batch submissions
     
     Returns:
@@ -137,7 +137,12 @@ async def submit_batches_async(batch_contents: List[Tuple[List[int], str]], max_
     return batch_ids
 
 
-async def process_batch_results_async(completed_batch_ids: List[str], max_concurrent: int = int(MAX_CONCURRENT_BATCH_PROCESSING), force_reprocess: bool = False):
+async def process_batch_results_async(
+    completed_batch_ids: List[str],
+    max_concurrent: int = int(MAX_CONCURRENT_BATCH_PROCESSING),
+    force_reprocess: bool = False,
+    content_hashes: Optional[Dict[int, str]] = None,
+) -> Set[int]:
     """
     Process completed batches concurrently: download results and upload summaries to MongoDB.
     
@@ -149,14 +154,18 @@ async def process_batch_results_async(completed_batch_ids: List[str], max_concur
         completed_batch_ids: List of completed batch IDs
         max_concurrent: Maximum concurrent batch processing operations
         force_reprocess: If True, reprocess batches even if marked as processed
+        content_hashes: Optional dict mapping qid to the content_hash stored with its summary
+    
+    Returns:
+        Set of QIDs whose summaries were rewritten from the downloaded results
     """
     if not completed_batch_ids:
         logger.info("No batches to process")
-        return
+        return set()
     
     semaphore = asyncio.Semaphore(max_concurrent)
     
-    async def process_single_batch(batch_id: str):
+    async def process_single_batch(batch_id: str) -> Set[int]:
         """Process a single batch: download results, upload summaries, verify and mark as processed."""
         async with semaphore:
             try:
@@ -164,7 +173,7 @@ async def process_batch_results_async(completed_batch_ids: List[str], max_concur
                 metadata = await batch_metadata_collection.find_one({"batch_id": batch_id})
                 if not metadata:
                     logger.warning(f"No metadata found for batch {batch_id}")
-                    return
+                    return set()
                 
                 # Check if there are no qids to process or if the batch is already processed
                 if not force_reprocess and metadata.get('processed', False):
@@ -172,7 +181,7 @@ async def process_batch_results_async(completed_batch_ids: List[str], max_concur
                     qids = metadata.get('qids', [])
                     if not qids:
                         logger.warning(f"No QIDs found for batch {batch_id}")
-                        return
+                        return set()
 
                     existing_summaries = await summary_collection.find(
                         {"qid": {"$in": qids}}
@@ -181,12 +190,12 @@ async def process_batch_results_async(completed_batch_ids: List[str], max_concur
                     
                     if len(existing_qids) == len(qids):
                         logger.info(f"Batch {batch_id} already processed and verified, skipping")
-                        return
+                        return set()
                     
                 output_file_id = metadata.get('result_file_id')
                 if not output_file_id:
                     logger.warning(f"No output file ID for batch {batch_id}")
-                    return
+                    return set()
                 
                 # Download and parse results (in memory only - no files written to disk)
                 logger.info(f"Processing batch {batch_id}...")
@@ -199,9 +208,9 @@ async def process_batch_results_async(completed_batch_ids: List[str], max_concur
                 # Upload summaries to MongoDB in batch (more efficient than one at a time)
                 if not results:
                     logger.warning(f"No results found for batch {batch_id}")
-                    return
+                    return set()
 
-                await batch_upload_summaries(results)
+                stored_qids = await batch_upload_summaries(results, content_hashes)
                 
                 # Verify summaries were actually saved to MongoDB
                 qids_in_results = list(results.keys())
@@ -223,21 +232,25 @@ async def process_batch_results_async(completed_batch_ids: List[str], max_concur
                         f"Batch {batch_id}: Only {len(existing_qids)}/{len(qids_in_results)} summaries found in DB after upload. "
                         f"Missing {missing_count} summaries. NOT marking as processed."
                     )
+                return stored_qids
                     
             except Exception as e:
                 logger.error(f"Error processing batch {batch_id}: {e}")
                 import traceback
                 logger.error(traceback.format_exc())
+                return set()
     
     # Process all batches concurrently
     tasks = [process_single_batch(batch_id) for batch_id in completed_batch_ids]
+    rewritten_qids: Set[int] = set()
     
     with async_tqdm(total=len(tasks), desc="Processing batches") as pbar:
         for coro in asyncio.as_completed(tasks):
             try:
-                await coro
+                rewritten_qids |= await coro
             except Exception as e:
                 logger.error(f"Unexpected error in batch processing: {e}")
             finally:
                 pbar.update(1)
-
+    
+    return rewritten_qids
@@ -44,7 +44,7 @@ async def poll_batch_status(batch_id: str) -> Tuple[str, Optional[str]]:
     try:
         batch = await llm_client.batches.retrieve(batch_id)
         status = batch.status
-        output_file_id = batch.output_file_id if hasattr(batch, 'output_file_id') and batch.output_file_id else None
+        output_file_id = getattr(batch, 'output_file_id', None) or None
         
         # Update MongoDB
         await batch_metadata_collection.update_one(
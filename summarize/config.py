@@ -16,9 +16,9 @@ from datetime import datetime
 from pathlib import Path
 
 from dotenv import load_dotenv
-from pymongo import AsyncMongoClient, MongoClient
+from pymongo import AsyncMongoClient
 import certifi
-from openai import AsyncOpenAI, OpenAI
+from openai import AsyncOpenAI
 
 # Load environment variables
 load_dotenv()
@@ -67,13 +67,12 @@ logger = logging.getLogger(__name__)
 # ============================================================================
 
 llm_client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-sync_llm_client = OpenAI(api_key=OPENAI_API_KEY)
+
 # ============================================================================
 # MongoDB Client & Collections
 # ============================================================================
 
 mongo_client = AsyncMongoClient(MONGODB_URL, tlsCAFile=certifi.where())
-sync_mongo_client = MongoClient(MONGODB_URL, tlsCAFile=certifi.where())
 db = mongo_client["leetcode_questions"]
 
 # Problem data collections
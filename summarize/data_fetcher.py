@@ -6,16 +6,35 @@ This module handles:
 - Formatting problem data for LLM prompts
 """
 
+import asyncio
+
 from utils.utils import extract_constraints_and_followup
 from summarize.config import collections, logger
 
+SOLUTION_LANGUAGES = ["python", "java", "cpp"]
+
+# Only the fields format_problem_data reads are sent back by MongoDB
+METADATA_PROJECTION = {
+    "_id": 0,
+    "qid": 1,
+    "title": 1,
+    "difficulty": 1,
+    "topics": 1,
+    "question_body": 1,
+    "hints": 1,
+    "code_stub": 1,
+    "similar_questions": 1,
+}
+SOLUTION_PROJECTION = {"_id": 0, "qid": 1, "code": 1}
+
 
 async def batch_fetch_problem_data(qids: list) -> dict:
     """
     Fetch all data for multiple problems in batch (much more efficient).
     
     This function makes only 4 MongoDB queries total (1 for metadata + 3 for languages)
-    instead of 4 queries per problem.
+    instead of 4 queries per problem. The 4 queries run concurrently and only return
+    the fields used by format_problem_data.
     
     Args:
         qids: List of question IDs
@@ -23,18 +42,19 @@ async def batch_fetch_problem_data(qids: list) -> dict:
     Returns:
         Dictionary mapping qid to problem data dict
     """
-    # Batch fetch metadata for all qids at once
-    metadata_cursor = collections["metadata"].find({"qid": {"$in": qids}})
-    metadata_dict = {}
-    async for doc in metadata_cursor:
-        metadata_dict[doc["qid"]] = doc
-    
-    # Batch fetch solutions for each language
-    solutions_dict = {lang: {} for lang in ["python", "java", "cpp"]}
-    for lang in ["python", "java", "cpp"]:
-        cursor = collections[lang].find({"qid": {"$in": qids}})
-        async for doc in cursor:
-            solutions_dict[lang][doc["qid"]] = doc
+    query = {"qid": {"$in": qids}}
+    metadata_docs, *solution_docs = await asyncio.gather(
+        collections["metadata"].find(query, METADATA_PROJECTION).to_list(length=None),
+        *(
+            collections[lang].find(query, SOLUTION_PROJECTION).to_list(length=None)
+            for lang in SOLUTION_LANGUAGES
+        ),
+    )
+    metadata_dict = {doc["qid"]: doc for doc in metadata_docs}
+    solutions_dict = {
+        lang: {doc["qid"]: doc for doc in docs}
+        for lang, docs in zip(SOLUTION_LANGUAGES, solution_docs)
+    }
     
     # Combine all data
     result = {}
@@ -42,7 +62,7 @@ async def batch_fetch_problem_data(qids: list) -> dict:
         data = {"qid": qid}
         if qid in metadata_dict:
             data["metadata"] = metadata_dict[qid]
-        for lang in ["python", "java", "cpp"]:
+        for lang in SOLUTION_LANGUAGES:
             if qid in solutions_dict[lang]:
                 data[lang] = solutions_dict[lang][qid]
         result[qid] = data
@@ -54,93 +74,68 @@ def format_problem_data(data):
     """
     Format problem data into a readable string for the prompt.
     
+    Each metadata field is read once, and each section is built as one string;
+    the sections are joined once at the end.
+    
     Args:
-        data: Dictionary containing problem data (from async_fetch_problem_data)
+        data: Dictionary containing problem data (from batch_fetch_problem_data)
     
     Returns:
         Formatted string with explicit headers for each section
     """
-    formatted = []
+    sections = []
     
     # Metadata
-    if "metadata" in data:
-        meta = data["metadata"]
-        
-        # Title
-        if meta.get('title'):
-            formatted.append("=== TITLE ===")
-            formatted.append(meta.get('title'))
-            formatted.append("")
+    meta = data.get("metadata")
+    if meta is not None:
+        title = meta.get('title')
+        difficulty = meta.get('difficulty')
+        topics = meta.get('topics')
+        hints = meta.get('hints')
+        code_stub = meta.get('code_stub')
+        similar = meta.get('similar_questions')
         
-        # Difficulty
-        if meta.get('difficulty'):
-            formatted.append("=== DIFFICULTY ===")
-            formatted.append(meta.get('difficulty'))
-            formatted.append("")
-        
-        # Topics
-        if meta.get('topics'):
-            formatted.append("=== TOPICS ===")
-            formatted.append(', '.join(meta.get('topics', [])))
-            formatted.append("")
+        if title:
+            sections.append(f"=== TITLE ===\n{title}\n")
+        if difficulty:
+            sections.append(f"=== DIFFICULTY ===\n{difficulty}\n")
+        if topics:
+            sections.append(f"=== TOPICS ===\n{', '.join(topics)}\n")
         
         # Parse question body to extract constraints and follow-up
-        question_body = meta.get('question_body', '')
-        main_question, constraints, follow_up = extract_constraints_and_followup(question_body)
+        main_question, constraints, follow_up = extract_constraints_and_followup(meta.get('question_body', ''))
         
         # Question Body (without constraints and follow-up)
         if main_question:
-            formatted.append("=== QUESTION ===")
-            formatted.append(main_question)
-            formatted.append("")
-        
-        # Constraints
+            sections.append(f"=== QUESTION ===\n{main_question}\n")
         if constraints:
-            formatted.append("=== CONSTRAINTS ===")
-            formatted.append(constraints)
-            formatted.append("")
-        
+            sections.append(f"=== CONSTRAINTS ===\n{constraints}\n")
         # Follow-up (from question body)
         if follow_up:
-            formatted.append("=== FOLLOW-UP ===")
-            formatted.append(follow_up)
-            formatted.append("")
+            sections.append(f"=== FOLLOW-UP ===\n{follow_up}\n")
         
-        # Hints
-        if meta.get('hints'):
-            formatted.append("=== HINTS ===")
-            for i, hint in enumerate(meta.get('hints', []), 1):
-                formatted.append(f"{i}. {hint}")
-            formatted.append("")
-        
-        # Code Stub
-        if meta.get('code_stub'):
-            formatted.append("=== CODE TEMPLATE ===")
-            formatted.append(meta.get('code_stub'))
-            formatted.append("")
+        if hints:
+            numbered = "\n".join(f"{i}. {hint}" for i, hint in enumerate(hints, 1))
+            sections.append(f"=== HINTS ===\n{numbered}\n")
+        if code_stub:
+            sections.append(f"=== CODE TEMPLATE ===\n{code_stub}\n")
         
         # Similar Questions (separate from follow-up in question body)
-        if meta.get('similar_questions'):
-            formatted.append("=== SIMILAR QUESTIONS ===")
-            similar = meta.get('similar_questions', [])
+        if similar:
             if isinstance(similar, list):
-                formatted.append(', '.join(str(q) for q in similar))
-            else:
-                formatted.append(str(similar))
-            formatted.append("")
+                similar = ', '.join(str(q) for q in similar)
+            sections.append(f"=== SIMILAR QUESTIONS ===\n{similar}\n")
     
     # Solutions
-    for lang in ["python", "java", "cpp"]:
-        if lang in data:
-            sol = data[lang]
-            formatted.append(f"=== {lang.upper()} SOLUTIONS ===")
-            code_list = sol.get("code", [])
-            if code_list:
-                for i, code in enumerate(code_list, 1):
-                    formatted.append(f"\nSolution {i}:\n{code}")
-            else:
-                formatted.append("No solutions available")
-            formatted.append("")
+    for lang in SOLUTION_LANGUAGES:
+        sol = data.get(lang)
+        if sol is None:
+            continue
+        code_list = sol.get("code", [])
+        if code_list:
+            body = "\n".join(f"\nSolution {i}:\n{code}" for i, code in enumerate(code_list, 1))
+        else:
+            body = "No solutions available"
+        sections.append(f"=== {lang.upper()} SOLUTIONS ===\n{body}\n")
     
-    return "\n".join(formatted)
-
+    return "\n".join(sections)
@@ -11,7 +11,7 @@ High-level behavior:
 import sys
 import asyncio
 import argparse
-import json
+import orjson
 from pathlib import Path
 from datetime import datetime
 from typing import List, Dict, Optional
@@ -26,17 +26,17 @@ from summarize.config import logger, mongo_client, batch_metadata_collection, ll
 from summarize.batch_polling import poll_until_terminal
 
 # get better name for this function
-async def rewrite_input_file_to_nano(openai_file_id: str, old_batch_id: str = None) -> Optional[str]:
+async def rewrite_input_file_to_nano(openai_file_id: str, old_batch_id: str = None) -> Optional[bytes]:
     """
     Download the existing input JSONL, switch model to gpt-5.1-nano, and upload a new file.
 
     Returns:
-        new_input_file_id if successful, else None.
+        Rewritten JSONL content as UTF-8 bytes if successful, else None.
     """
     try:
         file_resp = await llm_client.files.content(openai_file_id)
         
-        lines = file_resp.text.split("\n")
+        lines = file_resp.content.split(b"\n")
 
         # Rewrite each JSONL line to force model -> gpt-5.1-nano
         modified_lines = []
@@ -45,13 +45,13 @@ async def rewrite_input_file_to_nano(openai_file_id: str, old_batch_id: str = No
             if not line.strip():
                 continue
             try:
-                obj = json.loads(line)
+                obj = orjson.loads(line)
                 body = obj.get("body", {})
                 body["model"] = "gpt-5-nano-2025-08-07"
                 obj["body"] = body
-                modified_lines.append(json.dumps(obj))
+                modified_lines.append(orjson.dumps(obj))
 
-            except json.JSONDecodeError:
+            except orjson.JSONDecodeError:
                 logger.warning("Skipping malformed JSONL line during model rewrite")
                 continue
 
@@ -59,7 +59,7 @@ async def rewrite_input_file_to_nano(openai_file_id: str, old_batch_id: str = No
             logger.error(f"No valid JSONL lines after rewrite for batch {old_batch_id}")
             return None
 
-        jsonl_content = "\n".join(modified_lines)
+        jsonl_content = b"\n".join(modified_lines)
 
         return jsonl_content
     
@@ -70,7 +70,7 @@ async def rewrite_input_file_to_nano(openai_file_id: str, old_batch_id: str = No
         return None
 
 # get better name for this function
-async def combine_input_files_to_nano(batch_group: List[Dict]) -> str:
+async def combine_input_files_to_nano(batch_group: List[Dict]) -> Optional[bytes]:
     """
     Download input files from multiple batches, rewrite model to gpt-5.1-nano, combine them, and upload as a new file.
     
@@ -78,7 +78,7 @@ async def combine_input_files_to_nano(batch_group: List[Dict]) -> str:
         batch_group: List of batch metadata documents (typically 4, but can be 1-4)
     
     Returns:
-        new_input_file_id if successful, else None.
+        Rewritten JSONL content as UTF-8 bytes if successful, else None.
     """
     jsonl_contents = []
     
@@ -93,7 +93,8 @@ async def combine_input_files_to_nano(batch_group: List[Dict]) -> str:
         jsonl_content = await rewrite_input_file_to_nano(openai_file_id, old_batch_id)
         if jsonl_content:
             jsonl_contents.append(jsonl_content)
-            logger.info(f"Processed {len(jsonl_content.split("\n"))} lines from batch {old_batch_id}")
+            line_count = jsonl_content.count(b"\n") + 1
+            logger.info(f"Processed {line_count} lines from batch {old_batch_id}")
         else:
             logger.warning(f"Failed to rewrite input file for batch {old_batch_id}, skipping")
     
@@ -102,7 +103,7 @@ async def combine_input_files_to_nano(batch_group: List[Dict]) -> str:
         return None
     
     # Combine all JSONL contents
-    combined_jsonl = "\n".join(jsonl_contents)
+    combined_jsonl = b"\n".join(jsonl_contents)
     
     return combined_jsonl
 
@@ -113,7 +114,7 @@ async def create_combined_retry_batch(batch_group: List[Dict]) -> Optional[str]:
     
     Args:
         batch_group: List of batch metadata documents (1-4 batches to combine)
-        combined_jsonl_content: Combined JSONL content string (already rewritten to nano model)
+        combined_jsonl_content: Combined JSONL content bytes (already rewritten to nano model)
     
     Returns:
         new_batch_id if successful, else None
@@ -232,6 +232,11 @@ Generate the complete summary now based on the problem information that follows.
 
 """
 
+# OpenAI caches the prompt prefix automatically; sending the prompt first (as
+# `instructions`) and one shared cache key with every summary request routes them
+# to the same cache, so the prompt tokens are billed at the cached rate
+SUMMARY_PROMPT_CACHE_KEY = "leetcode-summary-prompt"
+
 
 def get_prompt() -> str:
     """
@@ -6,21 +6,39 @@ This module handles uploading summaries to MongoDB:
 - Batch summary uploads (more efficient)
 """
 
-from typing import Dict
+from typing import Dict, Optional, Set
 from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
 
 from summarize.config import summary_collection, logger
 
 
-async def async_upload_summary(qid: int, summary: str):
+def summary_document(qid: int, summary: str, content_hash: Optional[str] = None) -> Dict:
+    """
+    Build the stored document for a summary.
+    
+    The document replaces the old one, so a summary generated from unknown content
+    drops any previous content_hash and is regenerated on the next hash check.
+    """
+    document = {"qid": qid, "summary": summary}
+    if content_hash is not None:
+        document["content_hash"] = content_hash
+    return document
+
+
+async def async_upload_summary(qid: int, summary: str, content_hash: Optional[str] = None) -> bool:
     """
     Upload a single summary to MongoDB (async).
     
     Args:
         qid: Question ID
         summary: Summary text to upload
+        content_hash: Hash of what the summary was generated from, if known
+    
+    Returns:
+        True if the summary was stored, False otherwise
     """
-    summary_data = {"qid": qid, "summary": summary}
+    summary_data = summary_document(qid, summary, content_hash)
 
     try:
         await summary_collection.replace_one(
@@ -28,20 +46,27 @@ async def async_upload_summary(qid: int, summary: str):
             summary_data,
             upsert=True
         )
+        return True
     except Exception as e:
         logger.error(f"Error saving summary to DB for QID {qid}: {e}")
+        return False
 
 
-async def batch_upload_summaries(summaries: Dict[int, str]):
+async def batch_upload_summaries(summaries: Dict[int, str], content_hashes: Optional[Dict[int, str]] = None) -> Set[int]:
     """
     Upload multiple summaries to MongoDB in a single batch operation.
     More efficient than uploading one at a time.
     
     Args:
         summaries: Dict mapping qid to summary text
+        content_hashes: Optional dict mapping qid to the content_hash stored with its summary
+    
+    Returns:
+        Set of QIDs whose summaries were stored
     """
     if not summaries:
-        return
+        return set()
+    content_hashes = content_hashes or {}
     
     try:
         # Use bulk_write with ReplaceOne operations
@@ -49,7 +74,7 @@ async def batch_upload_summaries(summaries: Dict[int, str]):
         operations = [
             ReplaceOne(
                 {"qid": qid},
-                {"qid": qid, "summary": summary},
+                summary_document(qid, summary, content_hashes.get(qid)),
                 upsert=True
             )
             for qid, summary in summaries.items()
@@ -58,9 +83,24 @@ async def batch_upload_summaries(summaries: Dict[int, str]):
         # Execute bulk write
         result = await summary_collection.bulk_write(operations, ordered=False)
         logger.info(f"Bulk uploaded {result.upserted_count + result.modified_count} summaries")
+        return set(summaries)
+    except BulkWriteError as e:
+        # The write is unordered, so every other summary is already stored;
+        # only the rejected ones are retried
+        write_errors = e.details.get("writeErrors", [])
+        logger.warning(f"Bulk write rejected {len(write_errors)} summaries, retrying them individually")
+        items = list(summaries.items())
+        stored = set(summaries)
+        for err in write_errors:
+            qid, summary = items[err["index"]]
+            if not await async_upload_summary(qid, summary, content_hashes.get(qid)):
+                stored.discard(qid)
+        return stored
     except Exception as e:
         # Fallback to individual uploads if bulk write fails
         logger.warning(f"Bulk write failed, falling back to individual uploads: {e}")
+        stored = set()
         for qid, summary in summaries.items():
-            await async_upload_summary(qid, summary)
-
+            if await async_upload_summary(qid, summary, content_hashes.get(qid)):
+                stored.add(qid)
+        return stored
@@ -5,6 +5,8 @@ to the summary collection in MongoDB.
 
 import sys
 import json
+import asyncio
+import orjson
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -14,25 +16,20 @@ load_dotenv()
 
 # Ensure the project root is on the Python path
 project_root = Path(__file__).parent.parent
-sys.path.insert(0, str(project_root))
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
 
-from summarize.config import sync_mongo_client, sync_llm_client
+from summarize.config import llm_client, mongo_client, summary_collection
 from utils.utils import extract_qid_from_custom_id, extract_summary_from_result
 
 
-def get_qids_with_summaries():
+async def get_qids_with_summaries():
     """
     Query the question_summaries collection and return a set of all QIDs
     that have summaries, including QIDs from completed but not processed batches.
     """
-    db = sync_mongo_client["leetcode_questions"]
-    summary_collection = db["question_summaries"]
-    
-    # Get all documents from the summary collection
-    all_summaries = list(summary_collection.find({}, {"qid": 1, "_id": 0}))
-    
-    # Extract QIDs into a set
-    qids_with_summaries = {doc["qid"] for doc in all_summaries}
+    # distinct() returns just the qids, deduplicated on the server
+    qids_with_summaries = set(await summary_collection.distinct("qid"))
     
     print(f"Found {len(qids_with_summaries)} problems with summaries in collection")
     
@@ -50,7 +47,7 @@ def get_qids_with_summaries():
     return qids_with_summaries
 
 
-def find_summary_in_output_file(result_file_id: str, qid: int) -> str | None:
+async def find_summary_in_output_file(result_file_id: str, qid: int) -> str | None:
     """
     Find a summary for a specific QID within an OpenAI batch output file.
     
@@ -63,16 +60,16 @@ def find_summary_in_output_file(result_file_id: str, qid: int) -> str | None:
     """
     try:
         # Download file content from OpenAI
-        file_response = sync_llm_client.files.content(result_file_id)
-        content = file_response.text
+        file_response = await llm_client.files.content(result_file_id)
+        content = file_response.content
         
-        # Parse JSONL line by line
-        for line in content.strip().split('\n'):
+        # Parse JSONL line by line (orjson parses the raw bytes directly)
+        for line in content.strip().split(b'\n'):
             if not line:
                 continue
             try:
-                result_data = json.loads(line)
-            except json.JSONDecodeError as e:
+                result_data = orjson.loads(line)
+            except orjson.JSONDecodeError as e:
                 print(f"Error parsing JSON line: {e}")
                 continue
             
@@ -101,5 +98,12 @@ def find_summary_in_output_file(result_file_id: str, qid: int) -> str | None:
         return None
 
 
+async def main():
+    try:
+        await get_qids_with_summaries()
+    finally:
+        await mongo_client.close()
+
+
 if __name__ == "__main__":
-    get_qids_with_summaries()
+    asyncio.run(main())
@@ -4,17 +4,20 @@ Script to upload summaries for missing problems.
 This script:
 1. Takes a list of QIDs for missing problems
 2. Fetches problem data from MongoDB
-3. Creates a single batch for these QIDs
-4. Submits the batch synchronously (one batch)
-5. Polls until batch completion
+3. Creates one batch per BATCH_SIZE QIDs
+4. Submits the batches concurrently
+5. Polls all batches concurrently until they finish
 6. Uploads summaries to MongoDB
+
+Each stored summary records a content_hash of what it was generated from (model,
+prompt and problem data), so QIDs whose summary is already up to date are skipped.
 """
 
 import sys
-import json
+import hashlib
 import asyncio
 from pathlib import Path
-from typing import List, Dict
+from typing import List
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -24,24 +27,43 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from summarize.config import logger, mongo_client, batch_metadata_collection,summary_collection
+from summarize.config import logger, mongo_client, summary_collection
 from summarize.data_fetcher import batch_fetch_problem_data, format_problem_data
-from summarize.batch_api import upload_batch_file, create_batch, download_batch_results
-from summarize.batch_manager import store_batch_metadata
-from summarize.batch_polling import poll_until_terminal, poll_batch_status
-from summarize.summary_storage import batch_upload_summaries
+from summarize.batch_api import create_batch_files
+from summarize.batch_manager import submit_batches_async, process_batch_results_async
+from summarize.batch_polling import poll_until_terminal
 from summarize.summary_prompt import SUMMARY_GENERATION_PROMPT
 
+SUMMARY_MODEL = "gpt-5.1-2025-11-13"
+
+
+def summary_content_hash(problem_data_text: str) -> str:
+    """
+    Hash everything a summary is generated from: model, prompt and problem data.
+    
+    Args:
+        problem_data_text: Formatted problem data (from format_problem_data)
+    
+    Returns:
+        Hex digest stored as the summary's content_hash
+    """
+    content = f"{SUMMARY_MODEL}\n{SUMMARY_GENERATION_PROMPT}\n{problem_data_text}"
+    return hashlib.md5(content.encode("utf-8"), usedforsecurity=False).hexdigest()
+
 
 async def upload_missing_problems(qids: List[int]) -> bool:
     """
-    Upload summaries for missing problems by creating and processing a batch.
+    Upload summaries for missing problems by creating and processing batches.
+    
+    The QIDs are split into BATCH_SIZE batches that are submitted, polled and
+    processed concurrently (through batch_manager), so a long list of QIDs costs
+    roughly one batch turnaround rather than one per batch.
     
     Args:
         qids: List of question IDs to process
     
     Returns:
-        True if successful, False otherwise
+        True if every QID's summary is up to date afterwards, False otherwise
     """
     if not qids:
         logger.warning("No QIDs provided")
@@ -64,99 +86,71 @@ async def upload_missing_problems(qids: List[int]) -> bool:
         logger.info("Formatting problem data...")
         problems = []
         for qid in qids:
-            data = problem_data[qid]
-            problem_text = format_problem_data(data)
+            problem_text = format_problem_data(problem_data[qid])
             problems.append({
                 'qid': qid,
-                'problem_data_text': problem_text
+                'problem_data_text': problem_text,
+                'content_hash': summary_content_hash(problem_text),
             })
         
+        # Skip QIDs whose stored summary was generated from the same content
+        stored_hashes = {
+            doc["qid"]: doc["content_hash"]
+            for doc in await summary_collection.find(
+                {"qid": {"$in": qids}, "content_hash": {"$exists": True}},
+                {"_id": 0, "qid": 1, "content_hash": 1},
+            ).to_list(length=None)
+        }
+        problems = [p for p in problems if stored_hashes.get(p['qid']) != p['content_hash']]
+        if len(problems) < len(qids):
+            logger.info(f"Skipping {len(qids) - len(problems)} QID(s) with up-to-date summaries")
+        if not problems:
+            return True
+        
         # Step 3: Create JSONL batch content
         logger.info("Creating batch JSONL content...")
-        jsonl_lines = []
-        for problem in problems:
-            request_data = {
-                "custom_id": f"qid-{problem['qid']}",
-                "method": "POST",
-                "url": "/v1/responses",
-                "body": {
-                    "model": "gpt-5.1-2025-11-13",
-                    "instructions": SUMMARY_GENERATION_PROMPT,
-                    "input": f"Problem data:\n\n{problem['problem_data_text']}",
-                    "reasoning": {"effort": "medium"},
-                    "text": {"verbosity": "low"}
-                }
-            }
-            jsonl_lines.append(json.dumps(request_data))
-        
-        jsonl_content = "\n".join(jsonl_lines)
-        logger.info(f"Created JSONL with {len(jsonl_lines)} requests")
-        
-        # Step 4: Submit batch (synchronously - one batch)
-        logger.info("Uploading batch file to OpenAI...")
-        file_id = await upload_batch_file(jsonl_content)
-        logger.info(f"Uploaded file: {file_id}")
-        
-        logger.info("Creating batch job...")
-        batch_id = await create_batch(file_id)  # this also "submits" the batch
-        logger.info(f"Created batch: {batch_id}")
-        
-        logger.info("Storing batch metadata...")
-        await store_batch_metadata(batch_id, file_id, qids, "validating")
-        logger.info(f"Batch {batch_id} submitted successfully")
-        
-        # Step 5: Poll until completion
-        logger.info(f"Polling batch {batch_id} until completion...")
-        final_status = await poll_until_terminal(batch_id)
-        
-        if final_status != "completed":
-            logger.error(f"Batch {batch_id} ended with status: {final_status}")
-            return False
-        
-        logger.info(f"Batch {batch_id} completed successfully")
-        
-        # Step 6: Get result file ID and download results
-        status, output_file_id = await poll_batch_status(batch_id)
-        if not output_file_id:
-            logger.error(f"No output file ID for completed batch {batch_id}")
+        batch_contents = create_batch_files(problems, model=SUMMARY_MODEL)
+        logger.info(f"Created {len(batch_contents)} batch(es) for {len(problems)} requests")
+        
+        # Step 4: Submit batches (upload file → create batch → store metadata)
+        logger.info("Submitting batches to OpenAI...")
+        batch_ids = await submit_batches_async(batch_contents)
+        if len(batch_ids) != len(batch_contents):
+            logger.error(f"Only {len(batch_ids)}/{len(batch_contents)} batches were submitted")
+        if not batch_ids:
             return False
         
-        logger.info(f"Downloading batch results from file: {output_file_id}")
-        results = await download_batch_results(batch_id, output_file_id)
-        
-        if not results:
-            logger.error(f"No results downloaded for batch {batch_id}")
-            return False
-        
-        logger.info(f"Downloaded {len(results)} summaries")
-        
-        # Step 7: Upload summaries to MongoDB
-        logger.info("Uploading summaries to MongoDB...")
-        await batch_upload_summaries(results)
-        
-        # Step 8: Verify summaries were uploaded
-        qids_in_results = list(results.keys())
-        existing_summaries = await summary_collection.find(
-            {"qid": {"$in": qids_in_results}}
-        ).to_list(length=None)
-        existing_qids = {doc["qid"] for doc in existing_summaries}
-        
-        if len(existing_qids) == len(qids_in_results):
-            # Mark batch as processed
-            await batch_metadata_collection.update_one(
-                {"batch_id": batch_id},
-                {"$set": {"processed": True}}
-            )
-            logger.info(f"Successfully uploaded {len(results)} summaries to MongoDB")
-            logger.info(f"Batch {batch_id} marked as processed")
-            return True
-        else:
-            missing_count = len(qids_in_results) - len(existing_qids)
+        # Step 5: Poll all batches until they finish
+        logger.info(f"Polling {len(batch_ids)} batch(es) until completion...")
+        final_statuses = await asyncio.gather(*(poll_until_terminal(batch_id) for batch_id in batch_ids))
+        completed_batch_ids = []
+        for batch_id, final_status in zip(batch_ids, final_statuses):
+            if final_status == "completed":
+                completed_batch_ids.append(batch_id)
+            else:
+                logger.error(f"Batch {batch_id} ended with status: {final_status}")
+        
+        # Step 6: Download results, upload summaries, verify and mark batches processed.
+        # Each rewritten summary is stored with its content_hash in the same write, so
+        # a QID whose request failed keeps its old hash and is regenerated next time
+        logger.info(f"Processing {len(completed_batch_ids)} completed batch(es)...")
+        refreshed_qids = await process_batch_results_async(
+            completed_batch_ids,
+            content_hashes={p['qid']: p['content_hash'] for p in problems},
+        )
+        
+        # Step 7: Verify every QID that needed a new summary got one (an old
+        # summary left in place by a failed request does not count)
+        not_refreshed = [p['qid'] for p in problems if p['qid'] not in refreshed_qids]
+        if not_refreshed:
             logger.error(
-                f"Only {len(existing_qids)}/{len(qids_in_results)} summaries found in DB. "
-                f"Missing {missing_count} summaries."
+                f"Only {len(problems) - len(not_refreshed)}/{len(problems)} summaries were refreshed. "
+                f"Not refreshed QIDs: {not_refreshed}"
             )
             return False
+        
+        logger.info(f"Successfully uploaded summaries for all {len(problems)} QIDs")
+        return True
             
     except Exception as e:
         logger.error(f"Error uploading missing problems: {e}")
@@ -29,6 +29,8 @@ batch_size = 200
 batches = {"Python": [], "Java": [], "C++": []}
 directory = "/Users/anshvijay/Desktop/LeetCode/solutions"
 lang_map = {"py": "Python", "java": "Java", "cpp": "C++"}
+# Match directories that start with a number followed by a dot and space
+problem_dir_re = re.compile(r"^(\d+)\.")
 
 # Helper function(s)
 def flush_batches(ignore_batch_size=False):
@@ -55,22 +57,21 @@ existing_qids = {lang: set(col.distinct("qid")) for lang, col in collections.ite
 print({k: len(v) for k, v in existing_qids.items()})
 print("✅ Loaded existing qid sets")
 
-for name in tqdm(os.listdir(directory), desc="Scanning directories"):
+# One scandir pass; entry.is_dir() uses the type from the directory listing
+# instead of a stat call per entry
+with os.scandir(directory) as entries:
+    problem_dirs = [
+        entry for entry in entries
+        if problem_dir_re.match(entry.name) and entry.is_dir()
+    ]
 
-    # Match directories that start with a number followed by a dot and space
-    match = re.match(r"^(\d+)\.", name)
-    if not match:
-        continue
-
-    subdirectory_path = os.path.join(directory, name)
-    if not os.path.isdir(subdirectory_path):
-        continue
-    
+for entry in tqdm(problem_dirs, desc="Scanning directories"):
+    subdirectory_path = entry.path
     files_in_subdirectory = os.listdir(subdirectory_path)
 
     # keep track of question and solutions
     sols = {"Python": [], "Java": [], "C++": []}
-    qid = int(name.split(".")[0])
+    qid = int(problem_dir_re.match(entry.name).group(1))
 
     for file_name in files_in_subdirectory:
         
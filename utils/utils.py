@@ -9,6 +9,9 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# custom_id format used for summary batch requests: "qid-{number}"
+_QID_CUSTOM_ID_RE = re.compile(r'qid-(\d+)')
+
 
 def getSlugs():
     req = requests.get("https://leetcode.com/api/problems/all/")
@@ -220,14 +223,16 @@ def extract_qid_from_custom_id(custom_id: str) -> Optional[int]:
     Returns:
         QID as integer, or None if invalid
     """
-    if not custom_id or not custom_id.startswith('qid-'):
+    if not custom_id:
         return None
     
-    try:
-        return int(custom_id.replace('qid-', ''))
-    except ValueError:
-        logger.warning(f"Error extracting QID from custom_id '{custom_id}'")
+    match = _QID_CUSTOM_ID_RE.fullmatch(custom_id)
+    if match is None:
+        if custom_id.startswith('qid-'):
+            logger.warning(f"Error extracting QID from custom_id '{custom_id}'")
         return None
+    
+    return int(match[1])
 
 
 def extract_summary_from_result(result_data: Dict, qid: int) -> Optional[str]: